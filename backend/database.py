@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Sequence
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Wire compressors and the module PyMongo needs for them (zlib is built in)
+KOMPRESSOR_MODULE = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+# Environment variable -> MongoClient option
+POOL_OPTIONEN = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_CONNECTING": "maxConnecting",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+}
+
+
+def verfuegbare_kompressoren(gewuenscht: str) -> List[str]:
+    """Requested compressors whose library is installed; the server picks the first it supports"""
+    kompressoren = []
+    for name in filter(None, (k.strip() for k in gewuenscht.split(","))):
+        if name not in KOMPRESSOR_MODULE:
+            logger.warning(f"Unknown MongoDB compressor {name}, ignored")
+        elif KOMPRESSOR_MODULE[name] and importlib.util.find_spec(KOMPRESSOR_MODULE[name]) is None:
+            logger.info(f"MongoDB compressor {name} not available, {KOMPRESSOR_MODULE[name]} is not installed")
+        else:
+            kompressoren.append(name)
+    return kompressoren
+
+
+def client_optionen() -> Dict[str, Any]:
+    """MongoClient options from the environment; unset values keep the driver defaults"""
+    optionen = {option: int(os.environ[env]) for env, option in POOL_OPTIONEN.items() if os.environ.get(env)}
+    # Report documents carry base64 photos and signatures, compression pays off on the wire
+    kompressoren = verfuegbare_kompressoren(os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+    if kompressoren:
+        optionen["compressors"] = ",".join(kompressoren)
+    return optionen
+
+
+def befehl_collection(event) -> str:
+    """Collection a monitored command runs on, empty for commands like {"ping": 1}"""
+    collection = event.command.get(event.command_name)
+    if event.command_name == "getMore":
+        collection = event.command.get("collection")
+    return collection if isinstance(collection, str) else ""
+
+
+class PoolMetriken(monitoring.ConnectionPoolListener):
+    """Connection pool utilization per server, counted from PyMongo's pool events.
+
+    The callbacks run on the driver's threads, hence the lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._server: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "offen": 0,
+            "in_benutzung": 0,
+            "wartend": 0,
+            "erstellt": 0,
+            "checkout_fehler": 0,
+            "geleert": 0
+        })
+
+    def _zaehlen(self, event, **aenderungen):
+        adresse = "%s:%s" % event.address
+        with self._lock:
+            werte = self._server[adresse]
+            for name, delta in aenderungen.items():
+                werte[name] += delta
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {adresse: dict(werte) for adresse, werte in self._server.items()}
+
+    def pool_created(self, event):
+        self._zaehlen(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._zaehlen(event, geleert=1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._server.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._zaehlen(event, offen=1, erstellt=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._zaehlen(event, offen=-1)
+
+    def connection_check_out_started(self, event):
+        self._zaehlen(event, wartend=1)
+
+    def connection_check_out_failed(self, event):
+        self._zaehlen(event, wartend=-1, checkout_fehler=1)
+
+    def connection_checked_out(self, event):
+        self._zaehlen(event, wartend=-1, in_benutzung=1)
+
+    def connection_checked_in(self, event):
+        self._zaehlen(event, in_benutzung=-1)
+
+
+class Datenbank:
+    """The application's MongoDB database, connected per process.
+
+    Motor clients must not be shared across fork(), so under gunicorn every
+    worker connects in its own lifespan hook. Until then the object can be
+    imported and handed around; collection access is delegated to the
+    connected database (db.arbeitsberichte, db["jobs"], db.command(...)).
+    """
+
+    def __init__(self, url: str, name: str, event_listeners: Sequence = ()):
+        self.url = url
+        self.name = name
+        self.event_listeners = list(event_listeners)
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.datenbank: Optional[AsyncIOMotorDatabase] = None
+        # Generated files (job results) are kept in GridFS
+        self.dateien: Optional[AsyncIOMotorGridFSBucket] = None
+        self.pool_metriken = PoolMetriken()
+
+    def verbinden(self):
+        optionen = client_optionen()
+        self.client = AsyncIOMotorClient(self.url, event_listeners=[self.pool_metriken, *self.event_listeners], **optionen)
+        self.datenbank = self.client[self.name]
+        self.dateien = AsyncIOMotorGridFSBucket(self.datenbank, bucket_name="dateien")
+        logger.info(f"MongoDB client created (pid {os.getpid()}, options {optionen})")
+
+    def schliessen(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = self.datenbank = self.dateien = None
+
+    def pool_status(self) -> Dict[str, Any]:
+        return {
+            "max_pool_size": self.client.options.pool_options.max_pool_size if self.client else None,
+            "server": self.pool_metriken.snapshot()
+        }
+
+    def __getattr__(self, name: str):
+        # Only called for names that aren't attributes of Datenbank itself
+        datenbank = self.__dict__.get("datenbank")
+        if name.startswith("_") or datenbank is None:
+            raise AttributeError(f"Datenbank is not connected, cannot access {name}")
+        return getattr(datenbank, name)
+
+    def __getitem__(self, name: str):
+        if self.datenbank is None:
+            raise RuntimeError(f"Datenbank is not connected, cannot access {name}")
+        return self.datenbank[name]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Domain event types
+BERICHT_ERSTELLT = "bericht_erstellt"
+BERICHT_AKTUALISIERT = "bericht_aktualisiert"
+BERICHT_ABGESCHLOSSEN = "bericht_abgeschlossen"
+BERICHT_GELOESCHT = "bericht_geloescht"
+FOTO_HINZUGEFUEGT = "foto_hinzugefuegt"
+TERMIN_ERSTELLT = "termin_erstellt"
+TERMIN_AKTUALISIERT = "termin_aktualisiert"
+TERMIN_VERSCHOBEN = "termin_verschoben"
+
+# Change notifications sent to live clients
+ERSTELLT = "erstellt"
+GEAENDERT = "geaendert"
+GELOESCHT = "geloescht"
+RESYNC = "resync"
+
+
+class DomainEvent(BaseModel):
+    typ: str
+    daten: Dict[str, Any] = {}
+    zeitpunkt: datetime = Field(default_factory=datetime.utcnow)
+
+
+EventHandler = Callable[[DomainEvent], Awaitable[None]]
+
+
+class EventBus:
+    """In-process event bus; subscribers run on a background task, not on the write path.
+
+    emit() never blocks the caller. When the queue is full the event is dropped
+    and logged, so a slow subscriber can't build up unbounded memory.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._handlers: Dict[str, List[EventHandler]] = defaultdict(list)
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+
+    def subscribe(self, *typen: str):
+        """Decorator registering a coroutine for one or more event types"""
+        def decorator(handler: EventHandler):
+            for typ in typen:
+                self._handlers[typ].append(handler)
+            return handler
+        return decorator
+
+    def emit(self, typ: str, **daten):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(DomainEvent(typ=typ, daten=daten))
+        except asyncio.QueueFull:
+            logger.warning(f"Event queue full, dropping {typ}")
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self, timeout: float = 5.0):
+        """Deliver pending events, then stop the dispatcher"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} events not delivered on shutdown")
+        self._task.cancel()
+        self._queue = self._task = None
+
+    async def _dispatch(self):
+        while True:
+            event = await self._queue.get()
+            try:
+                handlers = self._handlers.get(event.typ, [])
+                ergebnisse = await asyncio.gather(*(h(event) for h in handlers), return_exceptions=True)
+                for handler, ergebnis in zip(handlers, ergebnisse):
+                    if isinstance(ergebnis, Exception):
+                        logger.error(f"Event handler {handler.__name__} failed for {event.typ}: {ergebnis}")
+            finally:
+                self._queue.task_done()
+
+
+class LiveBroadcaster:
+    """Fan out change notifications to connected live clients (SSE).
+
+    Every client gets its own bounded queue. A client that falls behind has its
+    backlog replaced by a single resync notification instead of buffering without
+    limit; it then reloads everything it shows.
+    """
+
+    def __init__(self, client_queue_size: int = 100):
+        self.client_queue_size = client_queue_size
+        self._clients: Dict[asyncio.Queue, tuple] = {}
+
+    def verbinden(self, benutzer_id: str, admin: bool) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.client_queue_size)
+        self._clients[queue] = (benutzer_id, admin)
+        return queue
+
+    def trennen(self, queue: asyncio.Queue):
+        self._clients.pop(queue, None)
+
+    @property
+    def anzahl_clients(self) -> int:
+        return len(self._clients)
+
+    def publish(self, entitaet: str, aktion: str, id: Optional[str], techniker_ids: Iterable[str] = ()):
+        """Notify admins and the technicians the entity belongs to (before and after the change)"""
+        techniker_ids = set(techniker_ids)
+        aenderung = {"entitaet": entitaet, "aktion": aktion, "id": id}
+        for queue, (benutzer_id, admin) in list(self._clients.items()):
+            if not admin and benutzer_id not in techniker_ids:
+                continue
+            try:
+                queue.put_nowait(aenderung)
+            except asyncio.QueueFull:
+                self._resync(queue)
+
+    def resync_alle(self):
+        """Tell every client to reload, e.g. after changes may have been missed"""
+        for queue in list(self._clients):
+            self._resync(queue)
+
+    def _resync(self, queue: asyncio.Queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"entitaet": None, "aktion": RESYNC, "id": None})
+
+
+# Collections watched for live clients and their entity names
+LIVE_SAMMLUNGEN = {"arbeitsberichte": "arbeitsbericht", "kalender": "kalender"}
+CHANGE_AKTIONEN = {"insert": ERSTELLT, "update": GEAENDERT, "replace": GEAENDERT, "delete": GELOESCHT}
+
+
+async def change_streams_verfuegbar(db) -> bool:
+    """Change streams need a replica set or a sharded cluster"""
+    hello = await db.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+# Change stream errors after which the resume point is gone for good; restart from now
+HISTORY_LOST_CODES = {280, 286}  # ChangeStreamFatalError, ChangeStreamHistoryLost
+# Only the fields the router needs; updateLookup and pre-images would otherwise ship whole reports with photos
+CHANGE_FELDER = ["id", "techniker_id", "kunde_id"]
+
+
+async def change_stream_verfolgen(
+    db, broadcaster: LiveBroadcaster, retry_sekunden: float = 5.0, max_retry_sekunden: float = 300.0
+):
+    """Forward inserts, updates and deletes of the live collections to the broadcaster.
+
+    Resumes after the last seen change when the stream is interrupted, backing
+    off exponentially while it keeps failing. Deletes only carry the technician
+    when pre-images are enabled on the collection; otherwise they go to admins
+    only. Returns on errors a retry can't fix (e.g. missing privileges or a
+    server without pre-image support), so the caller can fall back.
+    """
+    pipeline = [
+        {"$match": {
+            "ns.coll": {"$in": list(LIVE_SAMMLUNGEN)},
+            "operationType": {"$in": list(CHANGE_AKTIONEN)}
+        }},
+        {"$project": {
+            "operationType": 1, "ns": 1, "documentKey": 1,
+            **{f"{dokument}.{feld}": 1 for dokument in ("fullDocument", "fullDocumentBeforeChange") for feld in CHANGE_FELDER}
+        }},
+    ]
+    resume_token = None
+    fehler = 0
+    while True:
+        try:
+            async with db.watch(
+                pipeline,
+                full_document="updateLookup",
+                full_document_before_change="whenAvailable",
+                resume_after=resume_token
+            ) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    fehler = 0
+                    dokumente = [d for d in (change.get("fullDocument"), change.get("fullDocumentBeforeChange")) if d]
+                    broadcaster.publish(
+                        LIVE_SAMMLUNGEN[change["ns"]["coll"]],
+                        CHANGE_AKTIONEN[change["operationType"]],
+                        next((d["id"] for d in dokumente if "id" in d), None),
+                        {d["techniker_id"] for d in dokumente if d.get("techniker_id")}
+                    )
+        except OperationFailure as e:
+            if e.code in HISTORY_LOST_CODES:
+                # The resume point has left the oplog; start over and let clients reload
+                logger.warning(f"Change stream history lost, restarting: {e}")
+                resume_token = None
+                broadcaster.resync_alle()
+            elif not e.has_error_label("ResumableChangeStreamError"):
+                logger.error(f"Change stream failed permanently, live updates only cover this process: {e}")
+                return
+            else:
+                logger.warning(f"Change stream interrupted: {e}")
+        except PyMongoError as e:
+            logger.warning(f"Change stream interrupted: {e}")
+        wartezeit = min(max_retry_sekunden, retry_sekunden * 2 ** fehler)
+        fehler += 1
+        logger.info(f"Restarting change stream in {wartezeit:.0f}s")
+        await asyncio.sleep(wartezeit)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Job status values
+WARTEND = "wartend"
+IN_BEARBEITUNG = "in_bearbeitung"
+ERLEDIGT = "erledigt"
+FEHLGESCHLAGEN = "fehlgeschlagen"
+
+# Priorities, higher runs first
+PRIORITAET_HOCH = 10
+PRIORITAET_NORMAL = 5
+PRIORITAET_NIEDRIG = 0
+
+# Finished jobs and their result files are kept this long
+AUFBEWAHRUNG = timedelta(days=7)
+
+
+class JobAbbruch(Exception):
+    """Raised by a handler when retrying cannot succeed (e.g. the report was deleted)"""
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobQueue:
+    """Durable job queue on a MongoDB collection.
+
+    A worker claims a job by atomically setting a lease (sichtbar_ab). If the
+    worker dies the lease runs out and another worker picks the job up again.
+    Failed jobs are retried with exponential backoff up to max_versuche.
+    """
+
+    def __init__(self, db, collection: str = "jobs", sichtbarkeit_sekunden: int = 300, backoff_sekunden: float = 5.0):
+        self.db = db
+        self.collection = collection
+        self.sichtbarkeit = timedelta(seconds=sichtbarkeit_sekunden)
+        self.backoff_sekunden = backoff_sekunden
+
+    @property
+    def jobs(self):
+        # Resolved on use, the database connects only in the app lifespan
+        return self.db[self.collection]
+
+    async def create_indexes(self, aufbewahrung: timedelta = AUFBEWAHRUNG):
+        await self.jobs.create_index("id", unique=True)
+        await self.jobs.create_index([("status", 1), ("prioritaet", -1), ("verfuegbar_ab", 1)])
+        await self.jobs.create_index([("status", 1), ("sichtbar_ab", 1)])
+        # Finished jobs are removed after the retention period
+        await self.jobs.create_index("abgeschlossen_am", expireAfterSeconds=int(aufbewahrung.total_seconds()))
+
+    async def enqueue(
+        self,
+        typ: str,
+        payload: Dict[str, Any],
+        prioritaet: int = PRIORITAET_NORMAL,
+        max_versuche: int = 5,
+        benutzer_id: Optional[str] = None
+    ) -> str:
+        jetzt = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "typ": typ,
+            "payload": payload,
+            "status": WARTEND,
+            "prioritaet": prioritaet,
+            "versuche": 0,
+            "max_versuche": max_versuche,
+            "benutzer_id": benutzer_id,
+            "verfuegbar_ab": jetzt,
+            "sichtbar_ab": None,
+            "worker": None,
+            "fehler": None,
+            "ergebnis": None,
+            "erstellt_am": jetzt,
+            "abgeschlossen_am": None
+        }
+        await self.jobs.insert_one(job)
+        return job["id"]
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def claim(self, worker_id: str, typen: Optional[list] = None) -> Optional[Dict[str, Any]]:
+        """Lease the most urgent available job, including jobs whose lease has expired"""
+        while True:
+            jetzt = datetime.utcnow()
+            filter_query = {"$or": [
+                {"status": WARTEND, "verfuegbar_ab": {"$lte": jetzt}},
+                {"status": IN_BEARBEITUNG, "sichtbar_ab": {"$lte": jetzt}}
+            ]}
+            if typen:
+                filter_query["typ"] = {"$in": typen}
+            job = await self.jobs.find_one_and_update(
+                filter_query,
+                {
+                    "$set": {"status": IN_BEARBEITUNG, "sichtbar_ab": jetzt + self.sichtbarkeit, "worker": worker_id},
+                    "$inc": {"versuche": 1}
+                },
+                sort=[("prioritaet", -1), ("verfuegbar_ab", 1)],
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None or job["versuche"] <= job["max_versuche"]:
+                return job
+            # A worker died repeatedly while running this job
+            await self._abschliessen(job, FEHLGESCHLAGEN, fehler=job.get("fehler") or "Zeitüberschreitung der Bearbeitung")
+
+    async def verlaengern(self, job: Dict[str, Any]):
+        """Extend the lease of a running job (heartbeat)"""
+        await self.jobs.update_one(
+            {"id": job["id"], "worker": job["worker"], "status": IN_BEARBEITUNG},
+            {"$set": {"sichtbar_ab": datetime.utcnow() + self.sichtbarkeit}}
+        )
+
+    async def erledigt(self, job: Dict[str, Any], ergebnis: Optional[Dict[str, Any]] = None):
+        await self._abschliessen(job, ERLEDIGT, ergebnis=ergebnis)
+
+    async def fehler(self, job: Dict[str, Any], fehler: str, endgueltig: bool = False):
+        """Schedule a retry with exponential backoff or mark the job as failed"""
+        if endgueltig or job["versuche"] >= job["max_versuche"]:
+            await self._abschliessen(job, FEHLGESCHLAGEN, fehler=fehler)
+            return
+        wartezeit = self.backoff_sekunden * 2 ** (job["versuche"] - 1) * random.uniform(0.8, 1.2)
+        await self.jobs.update_one(
+            {"id": job["id"], "worker": job["worker"]},
+            {"$set": {
+                "status": WARTEND,
+                "verfuegbar_ab": datetime.utcnow() + timedelta(seconds=wartezeit),
+                "sichtbar_ab": None,
+                "fehler": fehler
+            }}
+        )
+
+    async def _abschliessen(self, job: Dict[str, Any], status: str, ergebnis=None, fehler=None):
+        await self.jobs.update_one(
+            {"id": job["id"], "worker": job["worker"]},
+            {"$set": {
+                "status": status,
+                "ergebnis": ergebnis,
+                "fehler": fehler,
+                "sichtbar_ab": None,
+                "abgeschlossen_am": datetime.utcnow()
+            }}
+        )
+
+
+class JobWorker:
+    """Runs registered handlers for claimed jobs with a fixed number of concurrent slots"""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], concurrency: int = 2, poll_sekunden: float = 1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_sekunden = poll_sekunden
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    async def run(self):
+        logger.info(f"Worker {self.worker_id} started for {sorted(self.handlers)}")
+        await asyncio.gather(*(self._slot() for _ in range(self.concurrency)))
+
+    async def _slot(self):
+        while not self._stop.is_set():
+            job = await self.queue.claim(self.worker_id, list(self.handlers))
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.poll_sekunden)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._ausfuehren(job)
+
+    async def _ausfuehren(self, job: Dict[str, Any]):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            ergebnis = await self.handlers[job["typ"]](job["payload"])
+        except JobAbbruch as e:
+            logger.warning(f"Job {job['id']} ({job['typ']}) aborted: {e}")
+            await self.queue.fehler(job, str(e), endgueltig=True)
+        except Exception as e:
+            logger.exception(f"Job {job['id']} ({job['typ']}) failed in attempt {job['versuche']}")
+            await self.queue.fehler(job, str(e))
+        else:
+            await self.queue.erledigt(job, ergebnis)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        intervall = self.queue.sichtbarkeit.total_seconds() / 3
+        while True:
+            await asyncio.sleep(intervall)
+            await self.queue.verlaengern(job)
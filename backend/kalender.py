@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Appointments with this status don't block a technician
+INAKTIVE_STATUS = ["abgesagt"]
+
+# Times shown to people (e.g. in push notifications)
+ORTSZEIT = ZoneInfo("Europe/Berlin")
+
+# serie_ende of a series without COUNT/UNTIL
+SERIE_OFFEN = datetime(9999, 12, 31)
+
+WOCHENTAGE = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+FREQUENZEN = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+
+def naive_utc(zeitpunkt: Optional[datetime]) -> Optional[datetime]:
+    """Times are stored and compared as naive UTC (the Mongo client is not tz_aware);
+    clients may send offsets, e.g. toISOString() values ending in "Z"."""
+    if zeitpunkt is None or zeitpunkt.tzinfo is None:
+        return zeitpunkt
+    return zeitpunkt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def ortszeit(zeitpunkt: datetime) -> datetime:
+    """A stored naive UTC time in ORTSZEIT, for display"""
+    return zeitpunkt.replace(tzinfo=timezone.utc).astimezone(ORTSZEIT)
+
+
+def overlap_filter(start: Optional[datetime], ende: Optional[datetime]) -> Dict[str, Any]:
+    """Mongo filter for appointments overlapping the half-open interval [start, ende).
+
+    Single appointments are matched on startzeit/endzeit, recurring series on the
+    start of their first and the end of their last occurrence."""
+    einzel = {"wiederholung": None}
+    serie = {"wiederholung": {"$ne": None}}
+    if ende is not None:
+        einzel["startzeit"] = serie["startzeit"] = {"$lt": ende}
+    if start is not None:
+        einzel["endzeit"] = {"$gt": start}
+        serie["serie_ende"] = {"$gt": start}
+    return {"$or": [einzel, serie]}
+
+
+def parse_rrule(regel: str) -> Dict[str, Any]:
+    """Parse the supported RRULE subset: FREQ, INTERVAL, COUNT, UNTIL and BYDAY (weekly only)"""
+    teile = {}
+    for teil in regel.strip().removeprefix("RRULE:").split(";"):
+        if not teil:
+            continue
+        name, _, wert = teil.partition("=")
+        teile[name.strip().upper()] = wert.strip().upper()
+
+    unbekannt = set(teile) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY"}
+    if unbekannt:
+        raise ValueError(f"Nicht unterstützte Wiederholungsregel: {', '.join(sorted(unbekannt))}")
+    if teile.get("FREQ") not in FREQUENZEN:
+        raise ValueError("FREQ muss DAILY, WEEKLY, MONTHLY oder YEARLY sein")
+    if "COUNT" in teile and "UNTIL" in teile:
+        raise ValueError("COUNT und UNTIL können nicht kombiniert werden")
+
+    rrule = {"freq": teile["FREQ"], "interval": int(teile.get("INTERVAL", 1)), "count": None, "until": None, "byday": []}
+    if rrule["interval"] < 1:
+        raise ValueError("INTERVAL muss mindestens 1 sein")
+    if "COUNT" in teile:
+        rrule["count"] = int(teile["COUNT"])
+        if rrule["count"] < 1:
+            raise ValueError("COUNT muss mindestens 1 sein")
+    if "UNTIL" in teile:
+        until = teile["UNTIL"].rstrip("Z")
+        rrule["until"] = datetime.strptime(until, "%Y%m%dT%H%M%S" if "T" in until else "%Y%m%d")
+        if "T" not in until:
+            rrule["until"] += timedelta(days=1, microseconds=-1)
+    if "BYDAY" in teile:
+        if rrule["freq"] != "WEEKLY":
+            raise ValueError("BYDAY wird nur mit FREQ=WEEKLY unterstützt")
+        try:
+            rrule["byday"] = sorted({WOCHENTAGE[tag] for tag in teile["BYDAY"].split(",")})
+        except KeyError:
+            raise ValueError("Ungültiger Wochentag in BYDAY")
+    return rrule
+
+
+def add_months(zeitpunkt: datetime, monate: int) -> datetime:
+    """Add months, clamping the day to the end of shorter months"""
+    monat_index = zeitpunkt.month - 1 + monate
+    jahr, monat = zeitpunkt.year + monat_index // 12, monat_index % 12 + 1
+    tag = min(zeitpunkt.day, calendar.monthrange(jahr, monat)[1])
+    return zeitpunkt.replace(year=jahr, month=monat, day=tag)
+
+
+def _teilserien(startzeit: datetime, rrule: Dict[str, Any]) -> List[Tuple[datetime, Any, int]]:
+    """Split a rule into arithmetic sub-series (erster_start, schritt, rang).
+
+    WEEKLY with BYDAY becomes one weekly sub-series per weekday. All first starts
+    lie within one step of startzeit, so occurrence k of the sub-series with rank r
+    is occurrence number k * len(teilserien) + r of the whole series."""
+    freq, interval = rrule["freq"], rrule["interval"]
+    if freq == "DAILY":
+        return [(startzeit, timedelta(days=interval), 0)]
+    if freq == "MONTHLY":
+        return [(startzeit, interval, 0)]
+    if freq == "YEARLY":
+        return [(startzeit, 12 * interval, 0)]
+
+    schritt = timedelta(weeks=interval)
+    if not rrule["byday"]:
+        return [(startzeit, schritt, 0)]
+    wochenanfang = startzeit - timedelta(days=startzeit.weekday())
+    erste = []
+    for tag in rrule["byday"]:
+        erster = wochenanfang + timedelta(days=tag)
+        if erster < startzeit:
+            erster += schritt
+        erste.append(erster)
+    erste.sort()
+    return [(erster, schritt, rang) for rang, erster in enumerate(erste)]
+
+
+def _nach_index(erster: datetime, schritt: Any, k: int) -> datetime:
+    if isinstance(schritt, timedelta):
+        return erster + k * schritt
+    return add_months(erster, k * schritt)
+
+
+def _erster_index(erster: datetime, schritt: Any, ab: datetime) -> int:
+    """Largest index whose occurrence starts no later than `ab` (lower bound for the window)"""
+    if ab <= erster:
+        return 0
+    if isinstance(schritt, timedelta):
+        return int((ab - erster) // schritt)
+    monate = (ab.year - erster.year) * 12 + ab.month - erster.month
+    return max(0, monate // schritt - 1)
+
+
+def serie_ende(startzeit: datetime, endzeit: datetime, regel: str) -> datetime:
+    """End of the last occurrence, SERIE_OFFEN for unbounded series"""
+    rrule = parse_rrule(regel)
+    dauer = endzeit - startzeit
+    if rrule["until"] is not None:
+        return max(rrule["until"], startzeit) + dauer
+    if rrule["count"] is None:
+        return SERIE_OFFEN
+
+    teilserien = _teilserien(startzeit, rrule)
+    letzter = startzeit
+    for erster, schritt, rang in teilserien:
+        k = (rrule["count"] - 1 - rang) // len(teilserien)
+        if k >= 0:
+            letzter = max(letzter, _nach_index(erster, schritt, k))
+    return letzter + dauer
+
+
+def vorkommen(startzeit: datetime, endzeit: datetime, regel: str, von: datetime, bis: datetime) -> Iterator[datetime]:
+    """Start times of occurrences overlapping [von, bis), in order.
+
+    Jumps directly to the window, so the cost depends on the window size and
+    not on how many occurrences precede it."""
+    rrule = parse_rrule(regel)
+    dauer = endzeit - startzeit
+    teilserien = _teilserien(startzeit, rrule)
+    treffer = []
+    for erster, schritt, rang in teilserien:
+        k = _erster_index(erster, schritt, von - dauer)
+        while True:
+            beginn = _nach_index(erster, schritt, k)
+            if beginn >= bis:
+                break
+            if rrule["count"] is not None and k * len(teilserien) + rang >= rrule["count"]:
+                break
+            if rrule["until"] is not None and beginn > rrule["until"]:
+                break
+            if beginn + dauer > von:
+                treffer.append(beginn)
+            k += 1
+    return iter(sorted(treffer))
+
+
+def serie_expandieren(serie: Dict[str, Any], von: datetime, bis: datetime) -> List[Dict[str, Any]]:
+    """Materialize the occurrences of a stored series inside [von, bis), skipping exceptions"""
+    ausnahmen = set(serie.get("ausnahmen") or [])
+    dauer = serie["endzeit"] - serie["startzeit"]
+    termine = []
+    for beginn in vorkommen(serie["startzeit"], serie["endzeit"], serie["wiederholung"], von, bis):
+        if beginn in ausnahmen:
+            continue
+        termin = dict(serie)
+        termin.update({
+            "id": vorkommen_id(serie["id"], beginn),
+            "startzeit": beginn,
+            "endzeit": beginn + dauer,
+            "serie_id": serie["id"],
+            "original_startzeit": beginn,
+            "ausnahmen": []
+        })
+        termine.append(termin)
+    return termine
+
+
+def vorkommen_id(serie_id: str, beginn: datetime) -> str:
+    return f"{serie_id}_{beginn:%Y%m%dT%H%M%S}"
+
+
+def termine_expandieren(termine: Iterable[Dict[str, Any]], von: datetime, bis: datetime) -> List[Dict[str, Any]]:
+    """Replace series in a query result by their occurrences in [von, bis)"""
+    ergebnis = []
+    for termin in termine:
+        if termin.get("wiederholung"):
+            ergebnis.extend(serie_expandieren(termin, von, bis))
+        else:
+            ergebnis.append(termin)
+    return ergebnis
+
+
+def ueberschneidungen(neue: List[Dict[str, Any]], bestehende: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Existing appointments overlapping any of the new ones; both lists sorted by startzeit"""
+    konflikte = []
+    i = 0
+    for termin in bestehende:
+        # New appointments ending before this one starts can't overlap any later one either
+        while i < len(neue) and neue[i]["endzeit"] <= termin["startzeit"]:
+            i += 1
+        j = i
+        while j < len(neue) and neue[j]["startzeit"] < termin["endzeit"]:
+            if neue[j]["endzeit"] > termin["startzeit"]:
+                konflikte.append(termin)
+                break
+            j += 1
+    return konflikte
+
+
+def freie_zeitfenster(
+    termine: Iterable[Dict[str, Any]],
+    techniker_ids: List[str],
+    start: datetime,
+    ende: datetime,
+    min_dauer: timedelta = timedelta(0)
+) -> Dict[str, List[Tuple[datetime, datetime]]]:
+    """Compute free slots per technician in one sweep.
+
+    `termine` must be sorted by (techniker_id, startzeit). Every technician in
+    `techniker_ids` gets an entry, technicians without appointments are free
+    for the whole window.
+    """
+    frei: Dict[str, List[Tuple[datetime, datetime]]] = {tid: [] for tid in techniker_ids}
+    gesehen = set()
+    aktueller_techniker = None
+    frei_ab = start
+
+    def abschliessen(techniker_id, bis):
+        if techniker_id in frei and bis > frei_ab and bis - frei_ab >= min_dauer:
+            frei[techniker_id].append((frei_ab, bis))
+
+    for termin in termine:
+        techniker_id = termin["techniker_id"]
+        if techniker_id != aktueller_techniker:
+            if aktueller_techniker is not None:
+                abschliessen(aktueller_techniker, ende)
+            aktueller_techniker = techniker_id
+            gesehen.add(techniker_id)
+            frei_ab = start
+
+        termin_start = max(termin["startzeit"], start)
+        termin_ende = min(termin["endzeit"], ende)
+        if termin_start > frei_ab:
+            abschliessen(techniker_id, termin_start)
+        frei_ab = max(frei_ab, termin_ende)
+
+    if aktueller_techniker is not None:
+        abschliessen(aktueller_techniker, ende)
+
+    # Technicians without any appointment in the window
+    if ende - start >= min_dauer:
+        for techniker_id in frei.keys() - gesehen:
+            frei[techniker_id].append((start, ende))
+    return frei
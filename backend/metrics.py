@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import time
+from typing import Dict, Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+from database import befehl_collection
+
+# Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR and
+# /metrics aggregates them; without it the metrics of the serving process are exported.
+MULTIPROZESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENZ_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_DAUER = Histogram(
+    "http_request_duration_seconds", "HTTP request duration by route template",
+    ["method", "route", "status"], buckets=LATENZ_BUCKETS
+)
+HTTP_IN_BEARBEITUNG = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", multiprocess_mode="livesum"
+)
+MONGO_DAUER = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command duration as reported by the driver",
+    ["command", "collection", "outcome"], buckets=LATENZ_BUCKETS
+)
+MONGO_POOL = Gauge(
+    "mongodb_pool_connections", "MongoDB pool connections of the scraped process by state",
+    ["server", "state"], multiprocess_mode="livesum"
+)
+PDF_DAUER = Histogram(
+    "pdf_render_duration_seconds", "Time spent rendering a PDF with ReportLab",
+    ["dokument"], buckets=LATENZ_BUCKETS
+)
+FOTO_GROESSE = Histogram(
+    "report_photo_size_bytes", "Size of uploaded report photos before base64 encoding",
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2e6, 4e6, 8e6, 16e6)
+)
+CACHE_ZUGRIFFE = Counter(
+    "cache_requests_total", "Lookups in in-process caches", ["cache", "result"]
+)
+
+
+def cache_zugriff(cache: str, treffer: bool):
+    CACHE_ZUGRIFFE.labels(cache, "hit" if treffer else "miss").inc()
+
+
+class MongoBefehlMetriken(monitoring.CommandListener):
+    """Feed MongoDB command durations into MONGO_DAUER"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        with self._lock:
+            self._collections[event.request_id] = befehl_collection(event)
+
+    def _beobachten(self, event, outcome: str):
+        with self._lock:
+            collection = self._collections.pop(event.request_id, "")
+        MONGO_DAUER.labels(event.command_name, collection, outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._beobachten(event, "success")
+
+    def failed(self, event):
+        self._beobachten(event, "failure")
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording latency per route template and in-flight requests.
+
+    The route template (/api/arbeitsberichte/{bericht_id}) is used instead of the
+    path to keep the label cardinality bounded. Event streams are not timed,
+    their duration is the lifetime of the connection.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        antwort: Dict[str, Any] = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                antwort["status"] = message["status"]
+                antwort["stream"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        HTTP_IN_BEARBEITUNG.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_BEARBEITUNG.dec()
+            if not antwort["stream"]:
+                route = scope.get("route")
+                HTTP_DAUER.labels(
+                    scope["method"],
+                    route.path if route is not None else "unmatched",
+                    antwort["status"]
+                ).observe(time.perf_counter() - start)
+
+
+def pool_metriken_setzen(pool_status: Dict[str, Any]):
+    for server, werte in pool_status["server"].items():
+        for zustand in ("offen", "in_benutzung", "wartend"):
+            MONGO_POOL.labels(server, zustand).set(werte[zustand])
+
+
+def metriken_exportieren() -> tuple:
+    """Body and content type for the /metrics endpoint"""
+    if MULTIPROZESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -4,19 +4,114 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm, mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, Image, Flowable, PageBreak
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+from reportlab.lib.utils import ImageReader
+from reportlab import rl_config
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+import reportlab
 import io
 import base64
+import tempfile
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, BinaryIO, Callable
 import os
 
+from tracing import stufe, tracer
+
+# Embedded TrueType fonts (only the used glyphs are embedded) so umlauts don't depend on the viewer.
+# PDF_SCHRIFT / PDF_SCHRIFT_FETT override the regular and bold font file.
+SCHRIFT_KANDIDATEN = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    # Bitstream Vera ships with ReportLab, so there is always a fallback
+    (os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf"),
+     os.path.join(os.path.dirname(reportlab.__file__), "fonts", "VeraBd.ttf")),
+]
+SCHRIFT = "HotiSans"
+SCHRIFT_FETT = "HotiSans-Bold"
+
+def schriften_registrieren():
+    kandidaten = SCHRIFT_KANDIDATEN
+    if os.environ.get("PDF_SCHRIFT"):
+        kandidaten = [(os.environ["PDF_SCHRIFT"], os.environ.get("PDF_SCHRIFT_FETT", os.environ["PDF_SCHRIFT"]))]
+    normal, fett = next((n, f) for n, f in kandidaten if os.path.exists(n) and os.path.exists(f))
+    pdfmetrics.registerFont(TTFont(SCHRIFT, normal))
+    pdfmetrics.registerFont(TTFont(SCHRIFT_FETT, fett))
+    # <b> in paragraphs maps to the bold face
+    pdfmetrics.registerFontFamily(SCHRIFT, normal=SCHRIFT, bold=SCHRIFT_FETT, italic=SCHRIFT, boldItalic=SCHRIFT_FETT)
+
+schriften_registrieren()
+
+# Binary instead of ASCII85 encoded streams; ASCII85 makes every embedded photo a quarter larger
+rl_config.useA85 = 0
+
+# PDFs up to this size stay in memory while spooled, larger ones go to a temporary file
+PDF_SPOOL_BYTES = int(os.environ.get("PDF_SPOOL_BYTES", str(1024 * 1024)))
+
+def spool_pdf(write: Callable, *args) -> tempfile.SpooledTemporaryFile:
+    """Run a write_*_pdf method into a spooled temporary file, rewound for reading"""
+    datei = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_BYTES)
+    try:
+        write(*args, datei)
+    except BaseException:
+        datei.close()
+        raise
+    datei.seek(0)
+    return datei
+
+class FotoReader(ImageReader):
+    """ImageReader for stored photos.
+
+    drawImage hashes getRGBData() to reuse repeated images, which decodes every
+    pixel. JPEGs are embedded as they are, so their encoded bytes are hashed instead."""
+
+    def __init__(self, daten: bytes):
+        super().__init__(io.BytesIO(daten))
+        self._daten = daten
+
+    def getRGBData(self):
+        if self.jpeg_fh() is not None:
+            self._dataA = None
+            return self._daten
+        return super().getRGBData()
+
+class LazyFoto(Flowable):
+    """Photo that is decoded only while its page is drawn.
+
+    Only the base64 string is referenced until then, so memory doesn't grow
+    with the number of photos in the appendix."""
+
+    def __init__(self, data: str, width: float, height: float):
+        super().__init__()
+        self.data = data
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        try:
+            bild = FotoReader(base64.b64decode(self.data))
+            self.canv.drawImage(bild, 0, 0, self.width, self.height)
+        except Exception as e:
+            print(f"Error drawing photo: {e}")
+            self.canv.setFont(SCHRIFT, 8)
+            self.canv.drawCentredString(self.width / 2, self.height / 2, "Foto nicht lesbar")
+
 class HotiEnergieTechPDFGenerator:
+    WORK_TIMES_COL_WIDTHS = [2*cm, 1.8*cm, 1.3*cm, 1.3*cm, 1.2*cm, 1.8*cm, 1.3*cm, 1.3*cm, 1.2*cm, 1.2*cm]
+    MATERIALS_COL_WIDTHS = [3*cm, 3*cm, 12*cm]
+
     def __init__(self):
         self.width, self.height = A4
         self.margin = 2 * cm
         self.styles = getSampleStyleSheet()
+        # The sample styles use Helvetica; switch them to the embedded fonts
+        for style in self.styles.byName.values():
+            if hasattr(style, 'fontName'):
+                style.fontName = SCHRIFT_FETT if 'Bold' in style.fontName else SCHRIFT
         
         # Custom styles for HotiEnergieTech branding
         self.styles.add(ParagraphStyle(
@@ -47,15 +142,13 @@ class HotiEnergieTechPDFGenerator:
     def generate_work_report_pdf(self, report_data: Dict[Any, Any], customer_data: Dict[Any, Any]) -> bytes:
         """Generate PDF for work report"""
         buffer = io.BytesIO()
-        
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=self.margin,
-            leftMargin=self.margin,
-            topMargin=self.margin,
-            bottomMargin=self.margin
-        )
+        self.write_work_report_pdf(report_data, customer_data, buffer)
+        return buffer.getvalue()
+
+    @tracer.start_as_current_span("pdf.write_work_report_pdf")
+    def write_work_report_pdf(self, report_data: Dict[Any, Any], customer_data: Dict[Any, Any], ziel: BinaryIO):
+        """Write PDF for work report into a binary file object"""
+        doc = self._dokument(ziel)
         
         story = []
         
@@ -83,9 +176,11 @@ class HotiEnergieTechPDFGenerator:
         if report_data.get('materialien'):
             self._add_materials_table(story, report_data['materialien'])
         
-        # Photos section
+        # Photos are listed in the appendix
         if report_data.get('fotos'):
-            self._add_photos_section(story, report_data['fotos'])
+            story.append(Paragraph("Fotos:", self.styles['HotiSubtitle']))
+            story.append(Paragraph(f"{len(report_data['fotos'])} Foto(s), siehe Fotoanhang", self.styles['HotiNormal']))
+            story.append(Spacer(1, 16))
         
         # Final information
         self._add_final_section(story, report_data)
@@ -96,11 +191,47 @@ class HotiEnergieTechPDFGenerator:
         # Footer
         self._add_footer(story)
         
-        doc.build(story)
-        buffer.seek(0)
+        # Photo appendix on separate pages
+        if report_data.get('fotos'):
+            self._add_photo_appendix(story, report_data['fotos'])
         
+        with stufe("pdf.build", "pdf", flowables=len(story)):
+            doc.build(story)
+
+    def generate_pruefbericht_pdf(self, report_data: Dict[Any, Any], customer_data: Dict[Any, Any]) -> bytes:
+        """Generate the Prüfbericht of a work report as its own PDF"""
+        buffer = io.BytesIO()
+        self.write_pruefbericht_pdf(report_data, customer_data, buffer)
         return buffer.getvalue()
 
+    @tracer.start_as_current_span("pdf.write_pruefbericht_pdf")
+    def write_pruefbericht_pdf(self, report_data: Dict[Any, Any], customer_data: Dict[Any, Any], ziel: BinaryIO):
+        """Write the Prüfbericht of a work report as its own PDF into a binary file object"""
+        doc = self._dokument(ziel)
+        
+        story = []
+        self._add_header(story)
+        self._add_pruefbericht_section(story, report_data['pruefbericht_feuerung'])
+        story.append(Spacer(1, 12))
+        self._add_customer_section(story, customer_data)
+        story.append(Paragraph(f"Zu Arbeitsbericht Nr. {report_data.get('nummer', 'N/A')}", self.styles['HotiNormal']))
+        self._add_footer(story)
+        
+        with stufe("pdf.build", "pdf", flowables=len(story)):
+            doc.build(story)
+
+    def _dokument(self, ziel: BinaryIO) -> SimpleDocTemplate:
+        return SimpleDocTemplate(
+            ziel,
+            pagesize=A4,
+            rightMargin=self.margin,
+            leftMargin=self.margin,
+            topMargin=self.margin,
+            bottomMargin=self.margin,
+            pageCompression=1
+        )
+
+    @stufe("pdf._add_header", "pdf")
     def _add_header(self, story):
         """Add company header"""
         header_data = [
@@ -113,7 +244,7 @@ class HotiEnergieTechPDFGenerator:
         header_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 10),
             ('TEXTCOLOR', (0, 0), (0, -1), colors.Color(0.17, 0.35, 0.63)),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (0, 0), SCHRIFT_FETT),
             ('ALIGN', (0, 0), (0, -1), 'LEFT'),
             ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
@@ -123,6 +254,7 @@ class HotiEnergieTechPDFGenerator:
         story.append(header_table)
         story.append(Spacer(1, 20))
 
+    @stufe("pdf._add_customer_section", "pdf")
     def _add_customer_section(self, story, customer_data):
         """Add customer information section"""
         story.append(Paragraph("Kundeninformation", self.styles['HotiSubtitle']))
@@ -136,9 +268,9 @@ class HotiEnergieTechPDFGenerator:
         customer_table = Table(customer_info, colWidths=[3*cm, 6*cm, 3*cm, 6*cm])
         customer_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+            ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+            ('FONTNAME', (2, 0), (2, -1), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ('LEFTPADDING', (0, 0), (-1, -1), 6),
@@ -150,6 +282,7 @@ class HotiEnergieTechPDFGenerator:
         story.append(customer_table)
         story.append(Spacer(1, 16))
 
+    @stufe("pdf._add_project_section", "pdf")
     def _add_project_section(self, story, report_data):
         """Add project information"""
         story.append(Paragraph("Projektinformation", self.styles['HotiSubtitle']))
@@ -169,9 +302,9 @@ class HotiEnergieTechPDFGenerator:
         project_table = Table(project_info, colWidths=[4*cm, 7*cm, 3*cm, 4*cm])
         project_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+            ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+            ('FONTNAME', (2, 0), (2, -1), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ('LEFTPADDING', (0, 0), (-1, -1), 6),
@@ -183,6 +316,7 @@ class HotiEnergieTechPDFGenerator:
         story.append(project_table)
         story.append(Spacer(1, 16))
 
+    @stufe("pdf._add_work_description", "pdf")
     def _add_work_description(self, story, report_data):
         """Add work description section"""
         story.append(Paragraph("Durchgeführte Arbeiten:", self.styles['HotiSubtitle']))
@@ -191,6 +325,7 @@ class HotiEnergieTechPDFGenerator:
         story.append(Paragraph(work_text, self.styles['HotiNormal']))
         story.append(Spacer(1, 16))
 
+    @stufe("pdf._add_work_times_table", "pdf")
     def _add_work_times_table(self, story, arbeitszeiten: List[Dict]):
         """Add work times table"""
         story.append(Paragraph("Arbeitszeiten:", self.styles['HotiSubtitle']))
@@ -201,31 +336,22 @@ class HotiEnergieTechPDFGenerator:
         table_data = [header_paragraphs]
         
         for zeit in arbeitszeiten:
-            row_data = [
-                zeit.get('name', ''),
-                zeit.get('datum', ''),
-                zeit.get('beginn', ''),
-                zeit.get('ende', ''),
-                zeit.get('pause', ''),
-                zeit.get('arbeitszeit', ''),
-                zeit.get('wegzeit', ''),
-                zeit.get('normal', ''),
-                zeit.get('ue50', ''),
-                zeit.get('ue100', '')
+            # Only the name can be long enough to wrap; the other cells are plain strings
+            row = [Paragraph(str(zeit.get('name', '')), self.styles['HotiNormal'])] + [
+                str(zeit.get(feld, ''))
+                for feld in ('datum', 'beginn', 'ende', 'pause', 'arbeitszeit', 'wegzeit', 'normal', 'ue50', 'ue100')
             ]
-            # Wrap each cell in a Paragraph to prevent wrapOn errors
-            row = [Paragraph(str(cell), self.styles['HotiNormal']) for cell in row_data]
             table_data.append(row)
         
         # Add empty rows if needed
         while len(table_data) < 6:  # At least 5 data rows
-            empty_row = [Paragraph('', self.styles['HotiNormal']) for _ in range(10)]
-            table_data.append(empty_row)
+            table_data.append([''] * 10)
         
-        work_table = Table(table_data, colWidths=[2*cm, 1.8*cm, 1.3*cm, 1.3*cm, 1.2*cm, 1.8*cm, 1.3*cm, 1.3*cm, 1.2*cm, 1.2*cm])
+        # LongTable lays out long tables page by page; the header is repeated on every page
+        work_table = LongTable(table_data, colWidths=self.WORK_TIMES_COL_WIDTHS, repeatRows=1)
         work_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, 0), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.black),
             ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.17, 0.35, 0.63)),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -239,6 +365,7 @@ class HotiEnergieTechPDFGenerator:
         story.append(work_table)
         story.append(Spacer(1, 16))
 
+    @stufe("pdf._add_materials_table", "pdf")
     def _add_materials_table(self, story, materialien: List[Dict]):
         """Add materials table"""
         story.append(Paragraph("Material:", self.styles['HotiSubtitle']))
@@ -249,24 +376,21 @@ class HotiEnergieTechPDFGenerator:
         table_data = [header_paragraphs]
         
         for material in materialien:
-            row_data = [
-                material.get('menge', ''),
-                material.get('einheit', ''),
-                material.get('bezeichnung', '')
+            row = [
+                str(material.get('menge', '')),
+                str(material.get('einheit', '')),
+                Paragraph(str(material.get('bezeichnung', '')), self.styles['HotiNormal'])
             ]
-            # Wrap each cell in a Paragraph
-            row = [Paragraph(str(cell), self.styles['HotiNormal']) for cell in row_data]
             table_data.append(row)
         
         # Add empty rows
         while len(table_data) < 8:  # At least 7 data rows
-            empty_row = [Paragraph('', self.styles['HotiNormal']) for _ in range(3)]
-            table_data.append(empty_row)
+            table_data.append([''] * 3)
         
-        material_table = Table(table_data, colWidths=[3*cm, 3*cm, 12*cm])
+        material_table = LongTable(table_data, colWidths=self.MATERIALS_COL_WIDTHS, repeatRows=1)
         material_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, 0), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.black),
             ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.17, 0.35, 0.63)),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -280,40 +404,35 @@ class HotiEnergieTechPDFGenerator:
         story.append(material_table)
         story.append(Spacer(1, 16))
 
-    def _add_photos_section(self, story, fotos: List[Dict]):
-        """Add photos section"""
-        story.append(Paragraph("Fotos:", self.styles['HotiSubtitle']))
+    @stufe("pdf._add_photo_appendix", "pdf")
+    def _add_photo_appendix(self, story, fotos: List[Dict]):
+        """Add all photos in a two column grid that continues over as many pages as needed"""
+        story.append(PageBreak())
+        story.append(Paragraph("Fotoanhang:", self.styles['HotiSubtitle']))
         
-        # Create a 2x2 grid for photos
         photo_data = []
         photo_row = []
         
-        for i, foto in enumerate(fotos[:4]):  # Maximum 4 photos
-            try:
-                # Decode base64 image
-                image_data = base64.b64decode(foto['data'])
-                image_buffer = io.BytesIO(image_data)
-                
-                # Create image with fixed size
-                img = Image(image_buffer, width=7*cm, height=5*cm)
-                caption = Paragraph(f"Foto {i+1}: {foto.get('beschreibung', '')}", self.styles['HotiNormal'])
-                
-                photo_cell = [img, caption]
-                photo_row.append(photo_cell)
-                
-                if len(photo_row) == 2 or i == len(fotos) - 1:
-                    photo_data.append(photo_row)
-                    photo_row = []
-                    
-            except Exception as e:
-                print(f"Error processing photo {i+1}: {e}")
+        for i, foto in enumerate(fotos):
+            if not foto.get('data'):
                 continue
+            
+            # Decoded when the page is drawn, not here
+            img = LazyFoto(foto['data'], width=7*cm, height=5*cm)
+            caption = Paragraph(f"Foto {i+1}: {foto.get('beschreibung') or ''}", self.styles['HotiNormal'])
+            photo_row.append([img, caption])
+            
+            if len(photo_row) == 2:
+                photo_data.append(photo_row)
+                photo_row = []
         
-        # Fill empty cells if needed
-        if len(photo_data) > 0 and len(photo_data[-1]) == 1:
-            photo_data[-1].append([Paragraph("", self.styles['HotiNormal']), Paragraph("", self.styles['HotiNormal'])])
+        # Fill the last row if needed
+        if photo_row:
+            photo_row.append([Paragraph("", self.styles['HotiNormal']), Paragraph("", self.styles['HotiNormal'])])
+            photo_data.append(photo_row)
         
         if photo_data:
+            # Rows split across pages like any other table
             photo_table = Table(photo_data, colWidths=[9*cm, 9*cm])
             photo_table.setStyle(TableStyle([
                 ('VALIGN', (0, 0), (-1, -1), 'TOP'),
@@ -325,9 +444,8 @@ class HotiEnergieTechPDFGenerator:
             ]))
             
             story.append(photo_table)
-        
-        story.append(Spacer(1, 16))
 
+    @stufe("pdf._add_final_section", "pdf")
     def _add_final_section(self, story, report_data):
         """Add final information section"""
         story.append(Paragraph("Abschluss:", self.styles['HotiSubtitle']))
@@ -340,9 +458,9 @@ class HotiEnergieTechPDFGenerator:
         final_table = Table(final_info, colWidths=[4*cm, 5*cm, 3*cm, 6*cm])
         final_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+            ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+            ('FONTNAME', (2, 0), (2, 0), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ('LEFTPADDING', (0, 0), (-1, -1), 6),
@@ -355,11 +473,14 @@ class HotiEnergieTechPDFGenerator:
         story.append(final_table)
         story.append(Spacer(1, 16))
 
+    @stufe("pdf._add_signature_section", "pdf")
     def _add_signature_section(self, story, report_data):
         """Add signature section"""
         story.append(Paragraph("Unterschriften:", self.styles['HotiSubtitle']))
         
         signature_data = []
+        # Finalized reports carry their completion date, so re-rendering them gives the same document
+        datum = (report_data.get('abgeschlossen_am') or datetime.now()).strftime('%d.%m.%Y')
         
         # Customer signature
         if report_data.get('unterschrift_kunde'):
@@ -370,18 +491,18 @@ class HotiEnergieTechPDFGenerator:
                 image_buffer = io.BytesIO(image_data)
                 
                 sig_img = Image(image_buffer, width=6*cm, height=3*cm)
-                signature_data.append([Paragraph("Datum:", self.styles['HotiNormal']), Paragraph(datetime.now().strftime('%d.%m.%Y'), self.styles['HotiNormal']), Paragraph("Unterschrift Kunde:", self.styles['HotiNormal']), sig_img])
+                signature_data.append([Paragraph("Datum:", self.styles['HotiNormal']), Paragraph(datum, self.styles['HotiNormal']), Paragraph("Unterschrift Kunde:", self.styles['HotiNormal']), sig_img])
             except:
-                signature_data.append([Paragraph("Datum:", self.styles['HotiNormal']), Paragraph(datetime.now().strftime('%d.%m.%Y'), self.styles['HotiNormal']), Paragraph("Unterschrift Kunde:", self.styles['HotiNormal']), Paragraph("", self.styles['HotiNormal'])])
+                signature_data.append([Paragraph("Datum:", self.styles['HotiNormal']), Paragraph(datum, self.styles['HotiNormal']), Paragraph("Unterschrift Kunde:", self.styles['HotiNormal']), Paragraph("", self.styles['HotiNormal'])])
         else:
-            signature_data.append([Paragraph("Datum:", self.styles['HotiNormal']), Paragraph(datetime.now().strftime('%d.%m.%Y'), self.styles['HotiNormal']), Paragraph("Unterschrift Kunde:", self.styles['HotiNormal']), Paragraph("", self.styles['HotiNormal'])])
+            signature_data.append([Paragraph("Datum:", self.styles['HotiNormal']), Paragraph(datum, self.styles['HotiNormal']), Paragraph("Unterschrift Kunde:", self.styles['HotiNormal']), Paragraph("", self.styles['HotiNormal'])])
         
         sig_table = Table(signature_data, colWidths=[2*cm, 3*cm, 4*cm, 9*cm])
         sig_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+            ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+            ('FONTNAME', (2, 0), (2, -1), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
             ('LEFTPADDING', (0, 0), (-1, -1), 6),
@@ -397,6 +518,7 @@ class HotiEnergieTechPDFGenerator:
             story.append(Spacer(1, 20))
             self._add_pruefbericht_section(story, report_data['pruefbericht_feuerung'])
 
+    @stufe("pdf._add_pruefbericht_section", "pdf")
     def _add_pruefbericht_section(self, story, pruefbericht):
         """Add Prüfbericht für Feuerungsanlagen section"""
         story.append(Paragraph("PRÜFBERICHT FÜR FEUERUNGSANLAGEN", self.styles['HotiTitle']))
@@ -412,10 +534,10 @@ class HotiEnergieTechPDFGenerator:
         header_table = Table(header_data, colWidths=[2.5*cm, 2.5*cm, 2.5*cm, 2.5*cm, 2.5*cm, 2.5*cm])
         header_table.setStyle(TableStyle([
             ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (4, 0), (4, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+            ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+            ('FONTNAME', (2, 0), (2, -1), SCHRIFT_FETT),
+            ('FONTNAME', (4, 0), (4, -1), SCHRIFT_FETT),
             ('GRID', (0, 0), (-1, -1), 1, colors.black),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
@@ -437,9 +559,9 @@ class HotiEnergieTechPDFGenerator:
             feuer_table = Table(feuer_data, colWidths=[4*cm, 5*cm, 3*cm, 6*cm])
             feuer_table.setStyle(TableStyle([
                 ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+                ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+                ('FONTNAME', (2, 0), (2, -1), SCHRIFT_FETT),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ]))
@@ -460,9 +582,9 @@ class HotiEnergieTechPDFGenerator:
             mess_table = Table(mess_data, colWidths=[4*cm, 5*cm, 4*cm, 5*cm])
             mess_table.setStyle(TableStyle([
                 ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+                ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+                ('FONTNAME', (2, 0), (2, -1), SCHRIFT_FETT),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ]))
@@ -496,7 +618,7 @@ class HotiEnergieTechPDFGenerator:
             anlass_table = Table(anlass_data, colWidths=[9*cm, 9*cm])
             anlass_table.setStyle(TableStyle([
                 ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+                ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
             ]))
@@ -523,7 +645,7 @@ class HotiEnergieTechPDFGenerator:
             messwerte_table = Table(messwerte_data, colWidths=[4.5*cm, 4.5*cm, 4.5*cm, 4.5*cm])
             messwerte_table.setStyle(TableStyle([
                 ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, 0), SCHRIFT_FETT),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.17, 0.35, 0.63)),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -548,9 +670,9 @@ class HotiEnergieTechPDFGenerator:
             maengel_table = Table(maengel_data, colWidths=[4*cm, 4*cm, 4*cm, 6*cm])
             maengel_table.setStyle(TableStyle([
                 ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (2, 0), (2, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, -1), SCHRIFT),
+                ('FONTNAME', (0, 0), (0, -1), SCHRIFT_FETT),
+                ('FONTNAME', (2, 0), (2, 0), SCHRIFT_FETT),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('VALIGN', (0, 0), (-1, -1), 'TOP'),
                 ('SPAN', (1, 1), (3, 1)),  # Span Bemerkung across columns
@@ -558,6 +680,7 @@ class HotiEnergieTechPDFGenerator:
             
             story.append(maengel_table)
 
+    @stufe("pdf._add_footer", "pdf")
     def _add_footer(self, story):
         """Add footer with company information"""
         story.append(Spacer(1, 20))
@@ -570,4 +693,15 @@ class HotiEnergieTechPDFGenerator:
         </para>
         """
         
-        story.append(Paragraph(footer_text, self.styles['Normal']))
\ No newline at end of file
+        story.append(Paragraph(footer_text, self.styles['Normal']))
+
+
+# One generator per process for batch rendering in a process pool
+_generator = None
+
+def pruefbericht_pdf(report_data: Dict[Any, Any], customer_data: Dict[Any, Any]) -> bytes:
+    """Prüfbericht PDF as bytes; a module level function so process pools can call it"""
+    global _generator
+    if _generator is None:
+        _generator = HotiEnergieTechPDFGenerator()
+    return _generator.generate_pruefbericht_pdf(report_data, customer_data)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, PstatsRenderer
+
+logger = logging.getLogger(__name__)
+
+# Profile ids are generated here; anything else is rejected before touching the file system
+PROFIL_ID = re.compile(r"^\d{8}T\d{6}_\d{6}_[0-9a-f]{8}$")
+FORMATE = {"html": "text/html", "pstats": "application/octet-stream"}
+
+
+class ProfilerMiddleware:
+    """Opt-in statistical profiling (pyinstrument) of production requests.
+
+    A fraction `rate` of requests is profiled and kept. With `schwelle_ms` set,
+    every request is profiled and kept when it took at least that long, which
+    catches spikes that sampling would miss at the cost of sampling overhead on
+    all requests. Each kept profile is stored as HTML flame view, pstats file
+    and JSON metadata; only the newest `max_profile` are kept.
+    """
+
+    def __init__(
+        self,
+        app,
+        verzeichnis: str,
+        rate: float = 0.0,
+        schwelle_ms: Optional[float] = None,
+        max_profile: int = 200,
+        intervall_ms: float = 1.0,
+        ausgenommen: tuple = ()
+    ):
+        self.app = app
+        self.verzeichnis = Path(verzeichnis)
+        self.verzeichnis.mkdir(parents=True, exist_ok=True)
+        self.rate = rate
+        self.schwelle_ms = schwelle_ms
+        self.max_profile = max_profile
+        self.intervall = intervall_ms / 1000
+        # Long-lived streams (SSE) would always exceed the threshold
+        self.ausgenommen = ausgenommen
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.ausgenommen):
+            await self.app(scope, receive, send)
+            return
+
+        stichprobe = random.random() < self.rate
+        if not stichprobe and self.schwelle_ms is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profiler = Profiler(interval=self.intervall, async_mode="enabled")
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            dauer_ms = (time.perf_counter() - start) * 1000
+            langsam = self.schwelle_ms is not None and dauer_ms >= self.schwelle_ms
+            if stichprobe or langsam:
+                route = scope.get("route")
+                metadaten = {
+                    "methode": scope["method"],
+                    "route": route.path if route is not None else "unmatched",
+                    "pfad": scope["path"],
+                    "status": status["code"],
+                    "dauer_ms": round(dauer_ms, 1),
+                    "grund": "langsam" if langsam else "stichprobe",
+                    "zeitpunkt": datetime.utcnow().isoformat()
+                }
+                # Rendering takes a while; the response has already been sent
+                await asyncio.get_running_loop().run_in_executor(None, self._speichern, session, metadaten)
+
+    def _speichern(self, session, metadaten: Dict[str, Any]):
+        try:
+            # Sortable by time, also across workers writing to the same directory
+            profil_id = f"{datetime.utcnow():%Y%m%dT%H%M%S_%f}_{uuid.uuid4().hex[:8]}"
+            basis = self.verzeichnis / profil_id
+            basis.with_suffix(".html").write_text(HTMLRenderer().render(session), encoding="utf-8")
+            basis.with_suffix(".pstats").write_bytes(
+                PstatsRenderer().render(session).encode("utf-8", errors="surrogateescape")
+            )
+            basis.with_suffix(".json").write_text(json.dumps({"id": profil_id, **metadaten}), encoding="utf-8")
+            self._rotieren()
+        except Exception as e:
+            logger.warning(f"Could not store profile: {e}")
+
+    def _rotieren(self):
+        profile = sorted(self.verzeichnis.glob("*.json"))
+        for alt in profile[:-self.max_profile]:
+            for endung in (".json", *(f".{f}" for f in FORMATE)):
+                alt.with_suffix(endung).unlink(missing_ok=True)
+
+
+def profile_auflisten(verzeichnis: str, route: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Metadata of stored profiles, newest first"""
+    profile = []
+    for datei in sorted(Path(verzeichnis).glob("*.json"), reverse=True):
+        try:
+            metadaten = json.loads(datei.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # Rotated away by another worker or still being written
+            continue
+        if route is None or metadaten["route"] == route:
+            profile.append(metadaten)
+    return profile
+
+
+def profil_datei(verzeichnis: str, profil_id: str, format: str) -> Optional[Path]:
+    if not PROFIL_ID.match(profil_id) or format not in FORMATE:
+        return None
+    datei = Path(verzeichnis) / f"{profil_id}.{format}"
+    return datei if datei.exists() else None
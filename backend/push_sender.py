@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from py_vapid import Vapid
+from pywebpush import WebPusher
+
+logger = logging.getLogger(__name__)
+
+# Push services answer with these when a subscription no longer exists
+ABGELAUFENE_STATUS = (404, 410)
+
+
+class WebPushSender:
+    """Deliver Web Push messages (VAPID, aes128gcm) to stored subscriptions.
+
+    Subscriptions are streamed from the cursor into a bounded queue that a fixed
+    number of workers drain over one shared HTTP session, so memory and open
+    connections stay bounded regardless of the number of subscribers.
+    """
+
+    def __init__(self, vapid_private_key: str, vapid_subject: str, concurrency: int = 20, ttl: int = 86400, timeout: float = 10.0):
+        self.vapid = Vapid.from_string(private_key=vapid_private_key)
+        self.vapid_subject = vapid_subject
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._vapid_headers: Dict[str, tuple] = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_vapid_headers(self, endpoint: str) -> Dict[str, str]:
+        """VAPID headers per push service origin, re-signed only shortly before they expire"""
+        url = urlparse(endpoint)
+        aud = f"{url.scheme}://{url.netloc}"
+        jetzt = int(time.time())
+        cached = self._vapid_headers.get(aud)
+        if cached is None or cached[1] - 60 < jetzt:
+            exp = jetzt + 12 * 60 * 60
+            headers = self.vapid.sign({"aud": aud, "exp": exp, "sub": self.vapid_subject})
+            cached = self._vapid_headers[aud] = (headers, exp)
+        return dict(cached[0])
+
+    async def _senden_an(self, session: aiohttp.ClientSession, abonnement: Dict[str, Any], daten: str) -> int:
+        subscription_info = {"endpoint": abonnement["endpoint"], "keys": abonnement["keys"]}
+        response = await WebPusher(subscription_info, aiohttp_session=session).send_async(
+            daten,
+            self._get_vapid_headers(abonnement["endpoint"]),
+            ttl=self.ttl,
+            timeout=self.timeout
+        )
+        # Release the connection back to the pool
+        await response.read()
+        return response.status
+
+    async def senden(self, db, nachricht: Dict[str, Any], filter_query: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Send a message to all subscriptions matching filter_query; removes expired ones"""
+        daten = json.dumps(nachricht, ensure_ascii=False)
+        session = await self._get_session()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        ergebnis = {"gesendet": 0, "fehlgeschlagen": 0, "entfernt": 0}
+        abgelaufen = []
+
+        async def worker():
+            while True:
+                abonnement = await queue.get()
+                try:
+                    if abonnement is None:
+                        return
+                    status = await self._senden_an(session, abonnement, daten)
+                    if status in ABGELAUFENE_STATUS:
+                        abgelaufen.append(abonnement["id"])
+                    elif status > 202:
+                        logger.warning(f"Push to {abonnement['endpoint'][:60]} failed with status {status}")
+                        ergebnis["fehlgeschlagen"] += 1
+                    else:
+                        ergebnis["gesendet"] += 1
+                except Exception as e:
+                    logger.warning(f"Push to subscription {abonnement['id']} failed: {e}")
+                    ergebnis["fehlgeschlagen"] += 1
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            async for abonnement in db.push_abonnements.find(filter_query or {}, {"_id": 0}):
+                await queue.put(abonnement)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        if abgelaufen:
+            result = await db.push_abonnements.delete_many({"id": {"$in": abgelaufen}})
+            ergebnis["entfernt"] = result.deleted_count
+        return ergebnis
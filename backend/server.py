@@ -1,23 +1,47 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response, ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from passlib.context import CryptContext
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from typing import List, Optional, Tuple, Union
+from contextlib import asynccontextmanager
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import jwt
 from enum import Enum
 import base64
+import hashlib
+import secrets
 import io
 import asyncio
-from pdf_generator import HotiEnergieTechPDFGenerator
+import contextvars
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pdf_generator import HotiEnergieTechPDFGenerator, spool_pdf
+from push_sender import WebPushSender
+import events
+from events import EventBus, LiveBroadcaster, change_stream_verfolgen, change_streams_verfuegbar
+from database import Datenbank
+import metrics
+import tracing
+from profiler import FORMATE as PROFIL_FORMATE, ProfilerMiddleware, profil_datei, profile_auflisten
+from tracing import stufe
+from job_queue import JobQueue, ERLEDIGT, PRIORITAET_HOCH, PRIORITAET_NORMAL
+from kalender import (
+    INAKTIVE_STATUS, naive_utc, ortszeit, overlap_filter, freie_zeitfenster, serie_ende, serie_expandieren,
+    termine_expandieren, ueberschneidungen, vorkommen_id
+)
 
 # Prüfbericht Models
 class FeuerungsanlagenDaten(BaseModel):
@@ -69,28 +93,78 @@ class PruefberichtFeuerung(BaseModel):
     zeichen: Optional[str] = ""
     dvr: Optional[str] = ""
     
-    feuerungsanlage: Optional[FeuerungsanlagenDaten] = FeuerungsanlagenDaten()
-    messgeraet: Optional[MessgeraetDaten] = MessgeraetDaten()
-    anlass: Optional[AnlassUeberpruefung] = AnlassUeberpruefung()
-    messwerte: Optional[Messwerte] = Messwerte()
-    maengel: Optional[Maengel] = Maengel()
+    # Factories, not shared instances: every report gets its own sections
+    feuerungsanlage: Optional[FeuerungsanlagenDaten] = Field(default_factory=FeuerungsanlagenDaten)
+    messgeraet: Optional[MessgeraetDaten] = Field(default_factory=MessgeraetDaten)
+    anlass: Optional[AnlassUeberpruefung] = Field(default_factory=AnlassUeberpruefung)
+    messwerte: Optional[Messwerte] = Field(default_factory=Messwerte)
+    maengel: Optional[Maengel] = Field(default_factory=Maengel)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, opened per worker process in the lifespan hook (pool settings via MONGO_* env)
+db = Datenbank(os.environ['MONGO_URL'], os.environ['DB_NAME'], event_listeners=[metrics.MongoBefehlMetriken(), tracing.MongoTracing()])
+# Slow work is handed to worker.py processes through this queue
+job_queue = JobQueue(db, sichtbarkeit_sekunden=int(os.getenv("JOB_SICHTBARKEIT_SEKUNDEN", "300")))
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the configured cost makes passlib flag hashes of any other cost
+# for an update, so changing BCRYPT_ROUNDS rehashes passwords on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt is CPU bound; run it on a small dedicated pool and reject work beyond the queue limit
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="passwort-hash")
+hash_pending = 0
 security = HTTPBearer()
 SECRET_KEY = os.getenv("SECRET_KEY", "hotienergietec_secret_key_2025")
 ALGORITHM = "HS256"
+# Web Push (VAPID); delivery is disabled until a key pair is configured
+VAPID_PRIVATE_KEY = os.getenv("VAPID_PRIVATE_KEY")
+VAPID_PUBLIC_KEY = os.getenv("VAPID_PUBLIC_KEY")
+VAPID_SUBJECT = os.getenv("VAPID_SUBJECT", "mailto:info@hotienergietec.at")
+push_sender = WebPushSender(
+    VAPID_PRIVATE_KEY,
+    VAPID_SUBJECT,
+    concurrency=int(os.getenv("PUSH_CONCURRENCY", "20")),
+    ttl=int(os.getenv("PUSH_TTL_SEKUNDEN", "86400"))
+) if VAPID_PRIVATE_KEY else None
+
+# Dashboard counters are cached per user and invalidated by report events
+STATISTIK_CACHE_SEKUNDEN = int(os.getenv("STATISTIK_CACHE_SEKUNDEN", "60"))
+statistik_cache: dict = {}
+
+# Active templates change a few times a year; every worker keeps them, serialized, in memory.
+# A version counter in db.versionen tells a worker that another one changed them.
+VORLAGEN_VERSION_PRUEFEN_SEKUNDEN = float(os.getenv("VORLAGEN_VERSION_PRUEFEN_SEKUNDEN", "5"))
+vorlagen_cache: dict = {"version": None, "geprueft": datetime.min, "vorlagen": [], "json": b"[]"}
+
+# Side effects of writes (notifications, cache invalidation) run as event subscribers
+event_bus = EventBus()
+
+# Opt-in profiling of sampled and slow requests
+PROFILER_AKTIV = os.getenv("PROFILER_AKTIV", "0") == "1"
+PROFILER_VERZEICHNIS = os.getenv("PROFILER_VERZEICHNIS", str(Path(__file__).parent / "profile"))
+
+# Live updates for the dashboard and calendar (SSE)
+live_broadcaster = LiveBroadcaster()
+SSE_KEEPALIVE_SEKUNDEN = 25
+change_stream_task: Optional[asyncio.Task] = None
+
+# Recurring appointments are checked for conflicts this far ahead
+KONFLIKT_HORIZONT = timedelta(days=int(os.getenv("KALENDER_KONFLIKT_HORIZONT_TAGE", "365")))
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "30"))
 
 # Create the main app
-app = FastAPI(title="HotiEnergieTech Arbeitsberichts-App")
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -114,8 +188,17 @@ class Benutzer(BaseModel):
     vollname: str
     rolle: BenutzerRolle
     aktiv: bool = True
+    # Incremented to revoke every token issued to this user
+    token_version: int = 0
     erstellt_am: datetime = Field(default_factory=datetime.utcnow)
 
+class AktuellerBenutzer(BaseModel):
+    """Authenticated user as carried in the access token claims"""
+    id: str
+    vollname: str
+    rolle: BenutzerRolle
+    token_version: int = 0
+
 class BenutzerErstellen(BaseModel):
     benutzername: str
     email: str
@@ -127,6 +210,13 @@ class BenutzerLogin(BaseModel):
     benutzername: str
     passwort: str
 
+class TokenErneuern(BaseModel):
+    refresh_token: str
+
+class Abmelden(BaseModel):
+    refresh_token: Optional[str] = None
+    alle_geraete: bool = False
+
 class Kunde(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     firmenname: str
@@ -171,6 +261,10 @@ class BerichtVorlage(BaseModel):
     felder: List[str]  # List of field names that this template includes
     kategorie: str  # e.g., "Heizung", "Sanitär", "Klima"
     aktiv: bool = True
+    # Prefilled into reports created from the template, for fields listed in felder
+    durchgefuehrte_arbeiten: Optional[str] = None
+    materialien: List[Material] = []
+    verrechnung: Optional[str] = None
     erstellt_am: datetime = Field(default_factory=datetime.utcnow)
 
 class KalenderTermin(BaseModel):
@@ -183,8 +277,31 @@ class KalenderTermin(BaseModel):
     techniker_id: str
     status: str = "geplant"  # geplant, in_bearbeitung, abgeschlossen, abgesagt
     bericht_id: Optional[str] = None
+    # Recurring series: RRULE subset (e.g. "FREQ=YEARLY") stored once and expanded per requested window
+    wiederholung: Optional[str] = None
+    ausnahmen: List[datetime] = []  # Original start times of cancelled or moved occurrences
+    serie_id: Optional[str] = None  # Set on occurrences of a series
+    original_startzeit: Optional[datetime] = None
     erstellt_am: datetime = Field(default_factory=datetime.utcnow)
 
+    @field_validator("startzeit", "endzeit", "original_startzeit")
+    @classmethod
+    def zeit_in_utc(cls, wert: Optional[datetime]) -> Optional[datetime]:
+        return naive_utc(wert)
+
+    @field_validator("ausnahmen")
+    @classmethod
+    def ausnahmen_in_utc(cls, werte: List[datetime]) -> List[datetime]:
+        return [naive_utc(wert) for wert in werte]
+
+class Zeitfenster(BaseModel):
+    start: datetime
+    ende: datetime
+
+class TechnikerVerfuegbarkeit(BaseModel):
+    techniker_id: str
+    freie_zeitfenster: List[Zeitfenster]
+
 class PushAbonnement(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     benutzer_id: str
@@ -198,6 +315,13 @@ class Foto(BaseModel):
     data: str  # Base64 encoded
     beschreibung: Optional[str] = None
 
+class ArchivPdf(BaseModel):
+    datei_id: str
+    sha256: str
+    groesse: int
+    stand: datetime  # aktualisiert_am of the rendered version
+    erstellt_am: datetime
+
 class Arbeitsbericht(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     nummer: str
@@ -220,6 +344,9 @@ class Arbeitsbericht(BaseModel):
     aktualisiert_am: datetime = Field(default_factory=datetime.utcnow)
     # Neuer Prüfbericht für Feuerungsanlagen
     pruefbericht_feuerung: Optional[PruefberichtFeuerung] = None
+    abgeschlossen_am: Optional[datetime] = None
+    # PDF rendered once the report was finalized
+    archiv_pdf: Optional[ArchivPdf] = None
 
 class ArbeitsberichtErstellen(BaseModel):
     kunde_id: str
@@ -243,38 +370,269 @@ class ArbeitsberichtUpdate(BaseModel):
     # Prüfbericht kann aktualisiert werden
     pruefbericht_feuerung: Optional[PruefberichtFeuerung] = None
 
+class BerichtAusVorlage(BaseModel):
+    vorlage_id: str
+    kunde_id: str
+    komm_nr: Optional[str] = None
+
+class BerichtKopieren(BaseModel):
+    kunde_id: Optional[str] = None  # Defaults to the customer of the copied report
+    komm_nr: Optional[str] = None
+
+class PruefberichteAuftrag(BaseModel):
+    # Range of pruefdatum, both days included
+    von: date
+    bis: date
+
 # Authentication functions
+# Revoked token versions per user, mirrored from db.token_widerrufe so revocations in any worker apply here
+# before old access tokens expire; reloaded at most every WIDERRUF_PRUEFEN_SEKUNDEN
+WIDERRUF_PRUEFEN_SEKUNDEN = float(os.getenv("WIDERRUF_PRUEFEN_SEKUNDEN", "5"))
+widerrufene_token_versionen: dict = {}
+widerrufe_geprueft = datetime.min
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(hours=24)
-    to_encode.update({"exp": expire})
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_MINUTES)
+    to_encode.update({"exp": expire, "typ": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def refresh_token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+async def create_token_pair(benutzer: dict) -> dict:
+    """Issue an access token with role/version claims and a new rotating refresh token"""
+    token_version = benutzer.get("token_version", 0)
+    access_token = create_access_token(data={
+        "sub": benutzer["id"],
+        "name": benutzer["vollname"],
+        "rolle": benutzer["rolle"],
+        "ver": token_version
+    })
+    
+    refresh_token = secrets.token_urlsafe(32)
+    await db.refresh_tokens.insert_one({
+        "token_hash": refresh_token_hash(refresh_token),
+        "benutzer_id": benutzer["id"],
+        "token_version": token_version,
+        "laeuft_ab": datetime.utcnow() + timedelta(days=REFRESH_TOKEN_DAYS),
+        "erstellt_am": datetime.utcnow()
+    })
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_MINUTES * 60
+    }
+
+async def revoke_tokens(benutzer_id: str):
+    """Invalidate all access and refresh tokens of a user"""
+    benutzer = await db.benutzer.find_one_and_update(
+        {"id": benutzer_id},
+        {"$inc": {"token_version": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    await db.refresh_tokens.delete_many({"benutzer_id": benutzer_id})
+    if benutzer:
+        # Kept until every access token issued before the revocation has expired
+        await db.token_widerrufe.update_one(
+            {"_id": benutzer_id},
+            {
+                "$max": {"token_version": benutzer["token_version"]},
+                "$set": {"laeuft_ab": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_MINUTES)}
+            },
+            upsert=True
+        )
+        widerrufene_token_versionen[benutzer_id] = benutzer["token_version"]
+
+async def widerrufe_laden():
+    """Reload the revoked token versions of all workers, at most every WIDERRUF_PRUEFEN_SEKUNDEN"""
+    global widerrufene_token_versionen, widerrufe_geprueft
+    jetzt = datetime.utcnow()
+    if jetzt < widerrufe_geprueft + timedelta(seconds=WIDERRUF_PRUEFEN_SEKUNDEN):
+        return
+    widerrufe_geprueft = jetzt
+    widerrufe = await db.token_widerrufe.find({}, {"token_version": 1}).to_list(None)
+    widerrufene_token_versionen = {w["_id"]: w["token_version"] for w in widerrufe}
+
+def decode_access_token(token: str) -> Tuple[AktuellerBenutzer, datetime]:
+    """Validate an access token and return its user and expiry"""
+    # Authorization is decided from the signed claims alone; no database lookup on the hot path
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        benutzer_id: str = payload.get("sub")
-        if benutzer_id is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("typ") != "access" or payload.get("sub") is None:
             raise HTTPException(status_code=401, detail="Ungültige Authentifizierung")
-    except jwt.PyJWTError:
+        benutzer = AktuellerBenutzer(
+            id=payload["sub"],
+            vollname=payload.get("name", ""),
+            rolle=payload["rolle"],
+            token_version=payload.get("ver", 0)
+        )
+        laeuft_ab = datetime.utcfromtimestamp(payload["exp"])
+    except (jwt.PyJWTError, KeyError, ValueError):
         raise HTTPException(status_code=401, detail="Ungültige Authentifizierung")
     
-    benutzer = await db.benutzer.find_one({"id": benutzer_id})
-    if benutzer is None:
-        raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+    if benutzer.token_version < widerrufene_token_versionen.get(benutzer.id, 0):
+        raise HTTPException(status_code=401, detail="Token wurde widerrufen")
     
-    return Benutzer(**benutzer)
+    return benutzer, laeuft_ab
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    with stufe("auth.get_current_user", "auth"):
+        await widerrufe_laden()
+        return decode_access_token(credentials.credentials)[0]
 
 # Helper functions
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def run_hash_job(func, *args):
+    """Run a password hashing call on the hash pool without blocking the event loop"""
+    global hash_pending
+    if hash_pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Zu viele Anmeldeversuche, bitte später erneut versuchen",
+            headers={"Retry-After": "1"}
+        )
+    hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hash_executor, func, *args)
+    finally:
+        hash_pending -= 1
+
+async def get_password_hash(password):
+    return await run_hash_job(pwd_context.hash, password)
+
+async def verify_password(plain_password, hashed_password):
+    """Verify a password; returns (valid, new_hash) where new_hash is set if the cost changed"""
+    return await run_hash_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def model_defaults(model) -> dict:
+    """Static field defaults of a model, used to complete stored documents"""
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+BERICHT_DEFAULTS = model_defaults(Arbeitsbericht)
+LEGACY_STATUS = {"ABGESCHLOSSEN": "abgeschlossen", "ENTWURF": "entwurf", "ARCHIVIERT": "archiviert"}
+
+def normalize_bericht(bericht: dict) -> dict:
+    """Clean a stored report so it matches the Arbeitsbericht schema without re-validating it"""
+    # Fix status field - normalize legacy uppercase values
+    status = bericht.get('status')
+    if status is None:
+        bericht['status'] = 'abgeschlossen'  # Default value
+    else:
+        bericht['status'] = LEGACY_STATUS.get(status, status)
+    
+    # Ensure arbeitszeiten and materialien have proper structure
+    if not bericht.get('arbeitszeiten'):
+        bericht['arbeitszeiten'] = []
+    if not bericht.get('materialien'):
+        bericht['materialien'] = []
+    
+    bericht.pop('_id', None)
+    for feld, default in BERICHT_DEFAULTS.items():
+        if feld not in bericht:
+            bericht[feld] = list(default) if isinstance(default, list) else default
+    return bericht
+
+ABGESCHLOSSENE_STATUS = (BerichtStatus.ABGESCHLOSSEN, BerichtStatus.ARCHIVIERT)
+
+def ist_abgeschlossen(bericht: dict) -> bool:
+    status = bericht.get('status')
+    return status is None or LEGACY_STATUS.get(status, status) in ABGESCHLOSSENE_STATUS
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def archiv_aktuell(bericht: dict) -> bool:
+    """Whether the archived PDF was rendered from the current version of the report"""
+    archiv = bericht.get('archiv_pdf')
+    return bool(archiv) and ist_abgeschlossen(bericht) and archiv['stand'] == bericht.get('aktualisiert_am')
+
+def trusted_response(content) -> ORJSONResponse:
+    """Serialize documents read from MongoDB directly, skipping response_model validation.
+    
+    Only use this for data that was validated on the way in."""
+    with stufe("serialisierung.orjson", "serialisierung"):
+        return ORJSONResponse(content=content)
+
+@asynccontextmanager
+async def techniker_sperre(techniker_id: str, lease_sekunden: int = 10, warten_sekunden: float = 5.0):
+    """Serialize calendar writes for one technician across all workers.
+    
+    Uses a lease document so a crashed worker can't hold the lock for longer than the lease."""
+    token = str(uuid.uuid4())
+    deadline = asyncio.get_running_loop().time() + warten_sekunden
+    while True:
+        jetzt = datetime.utcnow()
+        try:
+            await db.kalender_sperren.update_one(
+                {"_id": techniker_id, "gesperrt_bis": {"$lt": jetzt}},
+                {"$set": {"token": token, "gesperrt_bis": jetzt + timedelta(seconds=lease_sekunden)}},
+                upsert=True
+            )
+            break
+        except DuplicateKeyError:
+            # Another request currently holds the lock for this technician
+            if asyncio.get_running_loop().time() > deadline:
+                raise HTTPException(status_code=503, detail="Kalender wird gerade bearbeitet, bitte erneut versuchen")
+            await asyncio.sleep(0.05)
+    try:
+        yield
+    finally:
+        await db.kalender_sperren.delete_one({"_id": techniker_id, "token": token})
+
+def termin_dokument(termin: KalenderTermin) -> dict:
+    """Validate an appointment and build its stored document"""
+    if termin.endzeit <= termin.startzeit:
+        raise HTTPException(status_code=400, detail="Endzeit muss nach der Startzeit liegen")
+    
+    dokument = termin.model_dump()
+    dokument["serie_ende"] = None
+    if termin.wiederholung:
+        try:
+            dokument["serie_ende"] = serie_ende(termin.startzeit, termin.endzeit, termin.wiederholung)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Ungültige Wiederholung: {e}")
+    return dokument
+
+async def find_termin_konflikte(termin: dict, ausser_ids: tuple = ()):
+    """Active appointments of the technician overlapping the given appointment.
+    
+    For a series every occurrence within KONFLIKT_HORIZONT is checked, using one
+    indexed range query and a sweep over both sorted occurrence lists."""
+    von = termin["startzeit"]
+    if termin.get("wiederholung"):
+        bis = min(termin["serie_ende"], von + KONFLIKT_HORIZONT)
+        neue = serie_expandieren(termin, von, bis)
+    else:
+        bis = termin["endzeit"]
+        neue = [termin]
+    if not neue:
+        return []
+    
+    filter_query = {
+        "techniker_id": termin["techniker_id"],
+        "status": {"$nin": INAKTIVE_STATUS},
+        **overlap_filter(von, bis)
+    }
+    bestehende = await db.kalender.find(filter_query, {"_id": 0}).to_list(None)
+    bestehende = [
+        t for t in termine_expandieren(bestehende, von, bis)
+        if t["id"] not in ausser_ids and t.get("serie_id") not in ausser_ids
+    ]
+    bestehende.sort(key=lambda t: t["startzeit"])
+    return ueberschneidungen(neue, bestehende)
+
+def raise_termin_konflikt(konflikte: List[dict]):
+    raise HTTPException(status_code=409, detail={
+        "message": "Techniker ist in diesem Zeitraum bereits verplant",
+        "konflikte": [KalenderTermin(**k).model_dump(mode="json") for k in konflikte]
+    })
 
 async def generate_bericht_nummer():
     # Generate unique report number
@@ -292,27 +650,34 @@ async def benutzer_registrieren(benutzer_data: BenutzerErstellen):
     benutzer = Benutzer(
         benutzername=benutzer_data.benutzername,
         email=benutzer_data.email,
-        passwort_hash=get_password_hash(benutzer_data.passwort),
+        passwort_hash=await get_password_hash(benutzer_data.passwort),
         vollname=benutzer_data.vollname,
         rolle=benutzer_data.rolle
     )
     
-    await db.benutzer.insert_one(benutzer.dict())
+    await db.benutzer.insert_one(benutzer.model_dump())
     return {"message": "Benutzer erfolgreich erstellt"}
 
 @api_router.post("/auth/anmelden")
 async def benutzer_anmelden(login_data: BenutzerLogin):
     benutzer = await db.benutzer.find_one({"benutzername": login_data.benutzername})
-    if not benutzer or not verify_password(login_data.passwort, benutzer["passwort_hash"]):
+    if not benutzer:
+        raise HTTPException(status_code=401, detail="Ungültige Anmeldedaten")
+    
+    gueltig, neuer_hash = await verify_password(login_data.passwort, benutzer["passwort_hash"])
+    if not gueltig:
         raise HTTPException(status_code=401, detail="Ungültige Anmeldedaten")
     
     if not benutzer["aktiv"]:
         raise HTTPException(status_code=401, detail="Benutzer ist deaktiviert")
     
-    access_token = create_access_token(data={"sub": benutzer["id"]})
+    # Transparently upgrade hashes created with a different cost factor
+    if neuer_hash:
+        await db.benutzer.update_one({"id": benutzer["id"]}, {"$set": {"passwort_hash": neuer_hash}})
+    
+    tokens = await create_token_pair(benutzer)
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **tokens,
         "benutzer": {
             "id": benutzer["id"],
             "vollname": benutzer["vollname"],
@@ -320,37 +685,70 @@ async def benutzer_anmelden(login_data: BenutzerLogin):
         }
     }
 
+@api_router.post("/auth/token/erneuern")
+async def token_erneuern(token_data: TokenErneuern):
+    # Each refresh token is single use: remove it atomically and issue a new pair
+    gespeichert = await db.refresh_tokens.find_one_and_delete(
+        {"token_hash": refresh_token_hash(token_data.refresh_token)}
+    )
+    if not gespeichert or gespeichert["laeuft_ab"] < datetime.utcnow():
+        raise HTTPException(status_code=401, detail="Ungültiges Refresh-Token")
+    
+    benutzer = await db.benutzer.find_one({"id": gespeichert["benutzer_id"]})
+    if not benutzer or not benutzer["aktiv"]:
+        raise HTTPException(status_code=401, detail="Benutzer ist deaktiviert")
+    
+    if gespeichert["token_version"] != benutzer.get("token_version", 0):
+        raise HTTPException(status_code=401, detail="Token wurde widerrufen")
+    
+    return await create_token_pair(benutzer)
+
+@api_router.post("/auth/abmelden")
+async def benutzer_abmelden(abmelden_data: Abmelden, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    if abmelden_data.alle_geraete:
+        await revoke_tokens(current_user.id)
+    elif abmelden_data.refresh_token:
+        await db.refresh_tokens.delete_one({
+            "token_hash": refresh_token_hash(abmelden_data.refresh_token),
+            "benutzer_id": current_user.id
+        })
+    return {"message": "Erfolgreich abgemeldet"}
+
 @api_router.get("/auth/profil")
-async def get_profil(current_user: Benutzer = Depends(get_current_user)):
+async def get_profil(current_user: AktuellerBenutzer = Depends(get_current_user)):
+    benutzer = await db.benutzer.find_one({"id": current_user.id})
+    if benutzer is None:
+        raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+    
     return {
-        "id": current_user.id,
-        "benutzername": current_user.benutzername,
-        "email": current_user.email,
-        "vollname": current_user.vollname,
-        "rolle": current_user.rolle
+        "id": benutzer["id"],
+        "benutzername": benutzer["benutzername"],
+        "email": benutzer["email"],
+        "vollname": benutzer["vollname"],
+        "rolle": benutzer["rolle"]
     }
 
 # Customer Routes
 @api_router.post("/kunden", response_model=Kunde)
-async def kunde_erstellen(kunde_data: KundeErstellen, current_user: Benutzer = Depends(get_current_user)):
-    kunde = Kunde(**kunde_data.dict())
-    await db.kunden.insert_one(kunde.dict())
+async def kunde_erstellen(kunde_data: KundeErstellen, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    kunde = Kunde(**kunde_data.model_dump())
+    await db.kunden.insert_one(kunde.model_dump())
     return kunde
 
 @api_router.get("/kunden", response_model=List[Kunde])
-async def kunden_abrufen(current_user: Benutzer = Depends(get_current_user)):
-    kunden = await db.kunden.find().to_list(1000)
-    return [Kunde(**kunde) for kunde in kunden]
+async def kunden_abrufen(current_user: AktuellerBenutzer = Depends(get_current_user)):
+    kunden = await db.kunden.find({}, {"_id": 0}).to_list(1000)
+    return trusted_response(kunden)
 
 @api_router.get("/kunden/{kunde_id}", response_model=Kunde)
-async def kunde_abrufen(kunde_id: str, current_user: Benutzer = Depends(get_current_user)):
-    kunde = await db.kunden.find_one({"id": kunde_id})
+async def kunde_abrufen(kunde_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    kunde = await db.kunden.find_one({"id": kunde_id}, {"_id": 0})
     if not kunde:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
-    return Kunde(**kunde)
+    return trusted_response(kunde)
 
 @api_router.delete("/kunden/{kunde_id}")
-async def kunde_loeschen(kunde_id: str, current_user: Benutzer = Depends(get_current_user)):
+async def kunde_loeschen(kunde_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
     if current_user.rolle != BenutzerRolle.ADMIN:
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
@@ -360,32 +758,102 @@ async def kunde_loeschen(kunde_id: str, current_user: Benutzer = Depends(get_cur
     return {"message": "Kunde erfolgreich gelöscht"}
 
 # Work Report Routes
-@api_router.post("/arbeitsberichte", response_model=Arbeitsbericht)
-async def arbeitsbericht_erstellen(bericht_data: ArbeitsberichtErstellen, current_user: Benutzer = Depends(get_current_user)):
-    # Get customer info
-    kunde = await db.kunden.find_one({"id": bericht_data.kunde_id})
+async def kunde_laden(kunde_id: str) -> dict:
+    kunde = await db.kunden.find_one({"id": kunde_id}, {"_id": 0})
     if not kunde:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
-    
-    bericht_nummer = await generate_bericht_nummer()
-    
+    return kunde
+
+def pruefbericht_geruest(pruefbericht: Optional[dict]) -> PruefberichtFeuerung:
+    """Empty Prüfbericht for the next inspection; plant, instrument and DVR carry over from the previous one"""
+    if not pruefbericht:
+        return PruefberichtFeuerung()
+    return PruefberichtFeuerung(
+        dvr=pruefbericht.get("dvr") or "",
+        feuerungsanlage=pruefbericht.get("feuerungsanlage") or FeuerungsanlagenDaten(),
+        messgeraet=pruefbericht.get("messgeraet") or MessgeraetDaten()
+    )
+
+async def bericht_anlegen(kunde: dict, current_user: AktuellerBenutzer, **felder) -> ORJSONResponse:
+    """Store a new draft for the customer and answer with the stored document"""
     bericht = Arbeitsbericht(
-        nummer=bericht_nummer,
-        kunde_id=bericht_data.kunde_id,
+        nummer=await generate_bericht_nummer(),
+        kunde_id=kunde["id"],
         kunde_firmenname=kunde["firmenname"],
+        techniker_id=current_user.id,
+        techniker_name=current_user.vollname,
+        **felder
+    )
+    
+    dokument = bericht.model_dump()
+    await db.arbeitsberichte.insert_one(dokument)
+    event_bus.emit(events.BERICHT_ERSTELLT, bericht_id=bericht.id, techniker_id=bericht.techniker_id)
+    dokument.pop("_id")
+    return trusted_response(dokument)
+
+@api_router.post("/arbeitsberichte", response_model=Arbeitsbericht)
+async def arbeitsbericht_erstellen(bericht_data: ArbeitsberichtErstellen, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    kunde = await kunde_laden(bericht_data.kunde_id)
+    return await bericht_anlegen(
+        kunde, current_user,
         durchgefuehrte_arbeiten=bericht_data.durchgefuehrte_arbeiten,
         komm_nr=bericht_data.komm_nr,
         arbeitszeiten=bericht_data.arbeitszeiten,
         materialien=bericht_data.materialien,
         arbeit_abgeschlossen=bericht_data.arbeit_abgeschlossen,
         offene_arbeiten=bericht_data.offene_arbeiten,
-        verrechnung=bericht_data.verrechnung,
-        techniker_id=current_user.id,
-        techniker_name=current_user.vollname
+        verrechnung=bericht_data.verrechnung
     )
+
+@api_router.post("/arbeitsberichte/aus-vorlage", response_model=Arbeitsbericht)
+async def arbeitsbericht_aus_vorlage(daten: BerichtAusVorlage, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    """New draft for a customer, prefilled from a template"""
+    vorlagen = (await aktive_vorlagen())["vorlagen"]
+    vorlage = next((v for v in vorlagen if v["id"] == daten.vorlage_id), None)
+    if not vorlage:
+        raise HTTPException(status_code=404, detail="Vorlage nicht gefunden")
+    kunde = await kunde_laden(daten.kunde_id)
     
-    await db.arbeitsberichte.insert_one(bericht.dict())
-    return bericht
+    felder = {"komm_nr": daten.komm_nr, "durchgefuehrte_arbeiten": ""}
+    for feld in ("durchgefuehrte_arbeiten", "materialien", "verrechnung"):
+        if feld in vorlage["felder"] and vorlage.get(feld):
+            felder[feld] = vorlage[feld]
+    if "pruefbericht_feuerung" in vorlage["felder"]:
+        # The plant of a customer rarely changes between inspections
+        letzter = await db.arbeitsberichte.find_one(
+            {"kunde_id": kunde["id"], "pruefbericht_feuerung": {"$ne": None}},
+            {"_id": 0, "pruefbericht_feuerung": 1},
+            sort=[("erstellt_am", -1)]
+        )
+        felder["pruefbericht_feuerung"] = pruefbericht_geruest(letzter and letzter["pruefbericht_feuerung"])
+    return await bericht_anlegen(kunde, current_user, **felder)
+
+@api_router.post("/arbeitsberichte/{bericht_id}/kopieren", response_model=Arbeitsbericht)
+async def arbeitsbericht_kopieren(
+    bericht_id: str,
+    daten: Optional[BerichtKopieren] = None,
+    current_user: AktuellerBenutzer = Depends(get_current_user)
+):
+    """New draft for a repeat job: work description, materials and Prüfbericht skeleton of an earlier report"""
+    daten = daten or BerichtKopieren()
+    # Photos and the signature are not copied, so they are not loaded either
+    quelle = await db.arbeitsberichte.find_one({"id": bericht_id}, {"_id": 0, "fotos": 0, "unterschrift_kunde": 0})
+    if not quelle:
+        raise HTTPException(status_code=404, detail="Arbeitsbericht nicht gefunden")
+    
+    # Check permissions
+    if current_user.rolle != BenutzerRolle.ADMIN and quelle["techniker_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    
+    kunde = await kunde_laden(daten.kunde_id or quelle["kunde_id"])
+    return await bericht_anlegen(
+        kunde, current_user,
+        komm_nr=daten.komm_nr,
+        durchgefuehrte_arbeiten=quelle.get("durchgefuehrte_arbeiten") or "",
+        materialien=quelle.get("materialien") or [],
+        verrechnung=quelle.get("verrechnung") or "Regie",
+        pruefbericht_feuerung=pruefbericht_geruest(quelle["pruefbericht_feuerung"]) if quelle.get("pruefbericht_feuerung") else None
+    )
 
 @api_router.get("/arbeitsberichte", response_model=List[Arbeitsbericht])
 async def arbeitsberichte_abrufen(
@@ -393,7 +861,7 @@ async def arbeitsberichte_abrufen(
     limit: int = 50,
     status: Optional[BerichtStatus] = None,
     kunde_id: Optional[str] = None,
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     filter_query = {}
     
@@ -406,41 +874,14 @@ async def arbeitsberichte_abrufen(
     if kunde_id:
         filter_query["kunde_id"] = kunde_id
     
-    berichte = await db.arbeitsberichte.find(filter_query).skip(skip).limit(limit).sort("erstellt_am", -1).to_list(limit)
-    
-    # Clean and normalize data for Pydantic validation
-    cleaned_berichte = []
-    for bericht in berichte:
-        # Fix status field - normalize to lowercase
-        if 'status' in bericht:
-            if bericht['status'] == 'ABGESCHLOSSEN':
-                bericht['status'] = 'abgeschlossen'
-            elif bericht['status'] == 'ENTWURF':
-                bericht['status'] = 'entwurf'
-            elif bericht['status'] == 'ARCHIVIERT':
-                bericht['status'] = 'archiviert'
-        else:
-            bericht['status'] = 'abgeschlossen'  # Default value
-        
-        # Ensure arbeitszeiten has proper structure
-        if 'arbeitszeiten' not in bericht or not bericht['arbeitszeiten']:
-            bericht['arbeitszeiten'] = []
-        
-        # Ensure materialien has proper structure  
-        if 'materialien' not in bericht or not bericht['materialien']:
-            bericht['materialien'] = []
-            
-        # Convert _id to string if it exists
-        if '_id' in bericht:
-            del bericht['_id']
-            
-        cleaned_berichte.append(bericht)
-    
-    return [Arbeitsbericht(**bericht) for bericht in cleaned_berichte]
+    berichte = await db.arbeitsberichte.find(filter_query, {"_id": 0}).skip(skip).limit(limit).sort("erstellt_am", -1).to_list(limit)
+    
+    # Stored reports were validated on input; only clean legacy data before serializing
+    return trusted_response([normalize_bericht(bericht) for bericht in berichte])
 
 @api_router.get("/arbeitsberichte/{bericht_id}", response_model=Arbeitsbericht)
-async def arbeitsbericht_abrufen(bericht_id: str, current_user: Benutzer = Depends(get_current_user)):
-    bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
+async def arbeitsbericht_abrufen(bericht_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    bericht = await db.arbeitsberichte.find_one({"id": bericht_id}, {"_id": 0})
     if not bericht:
         raise HTTPException(status_code=404, detail="Arbeitsbericht nicht gefunden")
     
@@ -448,32 +889,13 @@ async def arbeitsbericht_abrufen(bericht_id: str, current_user: Benutzer = Depen
     if current_user.rolle != BenutzerRolle.ADMIN and bericht["techniker_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
-    # Clean data for Pydantic validation
-    if 'status' in bericht:
-        if bericht['status'] == 'ABGESCHLOSSEN':
-            bericht['status'] = 'abgeschlossen'
-        elif bericht['status'] == 'ENTWURF':
-            bericht['status'] = 'entwurf'  
-        elif bericht['status'] == 'ARCHIVIERT':
-            bericht['status'] = 'archiviert'
-    else:
-        bericht['status'] = 'abgeschlossen'
-    
-    # Ensure proper structure
-    if 'arbeitszeiten' not in bericht or not bericht['arbeitszeiten']:
-        bericht['arbeitszeiten'] = []
-    if 'materialien' not in bericht or not bericht['materialien']:
-        bericht['materialien'] = []
-    if '_id' in bericht:
-        del bericht['_id']
-    
-    return Arbeitsbericht(**bericht)
+    return trusted_response(normalize_bericht(bericht))
 
 @api_router.put("/arbeitsberichte/{bericht_id}", response_model=Arbeitsbericht)
 async def arbeitsbericht_aktualisieren(
     bericht_id: str,
     update_data: ArbeitsberichtUpdate,
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
     if not bericht:
@@ -484,16 +906,30 @@ async def arbeitsbericht_aktualisieren(
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
     # Update fields
-    update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
+    update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     update_dict["aktualisiert_am"] = datetime.utcnow()
     
-    await db.arbeitsberichte.update_one({"id": bericht_id}, {"$set": update_dict})
+    # The completion date is printed as the signature date of the PDF
+    war_abgeschlossen = ist_abgeschlossen(bericht)
+    if update_data.status in ABGESCHLOSSENE_STATUS and not war_abgeschlossen:
+        update_dict["abgeschlossen_am"] = update_dict["aktualisiert_am"]
+    elif update_data.status == BerichtStatus.ENTWURF and war_abgeschlossen:
+        update_dict["abgeschlossen_am"] = None
     
-    updated_bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
-    return Arbeitsbericht(**updated_bericht)
+    updated_bericht = await db.arbeitsberichte.find_one_and_update(
+        {"id": bericht_id}, {"$set": update_dict}, return_document=ReturnDocument.AFTER
+    )
+    
+    event_daten = dict(bericht_id=bericht_id, techniker_id=bericht["techniker_id"], nummer=bericht["nummer"])
+    event_bus.emit(events.BERICHT_AKTUALISIERT, **event_daten)
+    if update_data.status == BerichtStatus.ABGESCHLOSSEN and bericht.get("status") != BerichtStatus.ABGESCHLOSSEN:
+        event_bus.emit(events.BERICHT_ABGESCHLOSSEN, **event_daten)
+    
+    # The stored fields were validated by ArbeitsberichtUpdate; re-validating the whole report is not needed
+    return trusted_response(normalize_bericht(updated_bericht))
 
 @api_router.delete("/arbeitsberichte/{bericht_id}")
-async def arbeitsbericht_loeschen(bericht_id: str, current_user: Benutzer = Depends(get_current_user)):
+async def arbeitsbericht_loeschen(bericht_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
     bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
     if not bericht:
         raise HTTPException(status_code=404, detail="Arbeitsbericht nicht gefunden")
@@ -503,6 +939,9 @@ async def arbeitsbericht_loeschen(bericht_id: str, current_user: Benutzer = Depe
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
     await db.arbeitsberichte.delete_one({"id": bericht_id})
+    if bericht.get("archiv_pdf"):
+        await archiv_datei_loeschen(bericht["archiv_pdf"]["datei_id"])
+    event_bus.emit(events.BERICHT_GELOESCHT, bericht_id=bericht_id, techniker_id=bericht["techniker_id"])
     return {"message": "Arbeitsbericht erfolgreich gelöscht"}
 
 # Photo upload
@@ -511,7 +950,7 @@ async def foto_hochladen(
     bericht_id: str,
     foto: UploadFile = File(...),
     beschreibung: str = Form(None),
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
     if not bericht:
@@ -527,6 +966,7 @@ async def foto_hochladen(
     
     # Read and encode file
     contents = await foto.read()
+    metrics.FOTO_GROESSE.observe(len(contents))
     encoded_data = base64.b64encode(contents).decode('utf-8')
     
     new_foto = Foto(
@@ -538,8 +978,9 @@ async def foto_hochladen(
     # Update report with new photo
     await db.arbeitsberichte.update_one(
         {"id": bericht_id},
-        {"$push": {"fotos": new_foto.dict()}, "$set": {"aktualisiert_am": datetime.utcnow()}}
+        {"$push": {"fotos": new_foto.model_dump()}, "$set": {"aktualisiert_am": datetime.utcnow()}}
     )
+    event_bus.emit(events.FOTO_HINZUGEFUEGT, bericht_id=bericht_id, techniker_id=bericht["techniker_id"], foto_id=new_foto.id)
     
     return {"message": "Foto erfolgreich hochgeladen", "foto_id": new_foto.id}
 
@@ -548,7 +989,7 @@ async def foto_hochladen(
 async def unterschrift_speichern(
     bericht_id: str,
     unterschrift_data: str = Form(...),
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
     if not bericht:
@@ -563,12 +1004,20 @@ async def unterschrift_speichern(
         {"id": bericht_id},
         {"$set": {"unterschrift_kunde": unterschrift_data, "aktualisiert_am": datetime.utcnow()}}
     )
+    event_bus.emit(events.BERICHT_AKTUALISIERT, bericht_id=bericht_id, techniker_id=bericht["techniker_id"], nummer=bericht["nummer"])
     
     return {"message": "Unterschrift erfolgreich gespeichert"}
 
 # Dashboard stats
 @api_router.get("/dashboard/statistiken")
-async def dashboard_statistiken(current_user: Benutzer = Depends(get_current_user)):
+async def dashboard_statistiken(current_user: AktuellerBenutzer = Depends(get_current_user)):
+    cache_key = "admin" if current_user.rolle == BenutzerRolle.ADMIN else current_user.id
+    cached = statistik_cache.get(cache_key)
+    treffer = cached is not None and cached[0] > datetime.utcnow()
+    metrics.cache_zugriff("dashboard_statistiken", treffer)
+    if treffer:
+        return cached[1]
+    
     filter_query = {}
     if current_user.rolle != BenutzerRolle.ADMIN:
         filter_query["techniker_id"] = current_user.id
@@ -577,16 +1026,100 @@ async def dashboard_statistiken(current_user: Benutzer = Depends(get_current_use
     entwurf_berichte = await db.arbeitsberichte.count_documents({**filter_query, "status": BerichtStatus.ENTWURF})
     abgeschlossen_berichte = await db.arbeitsberichte.count_documents({**filter_query, "status": BerichtStatus.ABGESCHLOSSEN})
     
-    return {
+    statistiken = {
         "total_berichte": total_berichte,
         "entwurf_berichte": entwurf_berichte,
         "abgeschlossen_berichte": abgeschlossen_berichte,
         "kunden_anzahl": await db.kunden.count_documents({}) if current_user.rolle == BenutzerRolle.ADMIN else 0
     }
+    statistik_cache[cache_key] = (datetime.utcnow() + timedelta(seconds=STATISTIK_CACHE_SEKUNDEN), statistiken)
+    return statistiken
+
+# Live updates
+@api_router.get("/events")
+async def live_events(request: Request, token: str):
+    """Server-Sent Events stream of changed reports and appointments.
+
+    EventSource can't send headers, so the access token is passed as query
+    parameter. The stream ends when the token expires; the client reconnects
+    with a fresh one.
+    """
+    await widerrufe_laden()
+    current_user, laeuft_ab = decode_access_token(token)
+    queue = live_broadcaster.verbinden(current_user.id, current_user.rolle == BenutzerRolle.ADMIN)
+    
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                restzeit = (laeuft_ab - datetime.utcnow()).total_seconds()
+                if restzeit <= 0:
+                    yield "event: token_abgelaufen\ndata: {}\n\n"
+                    return
+                try:
+                    aenderung = await asyncio.wait_for(queue.get(), min(SSE_KEEPALIVE_SEKUNDEN, restzeit))
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {aenderung['aktion']}\ndata: {json.dumps(aenderung)}\n\n"
+        finally:
+            live_broadcaster.trennen(queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # PDF Export
+PDF_CHUNK_BYTES = 64 * 1024
+
+async def pdf_rendern(write, *args) -> tempfile.SpooledTemporaryFile:
+    """Render a PDF off the event loop into a spooled temporary file"""
+    # The copied context keeps the pdf stages in the request's Server-Timing
+    return await asyncio.get_running_loop().run_in_executor(
+        None, contextvars.copy_context().run, spool_pdf, write, *args
+    )
+
+def pdf_antwort(datei: tempfile.SpooledTemporaryFile, dateiname: str) -> StreamingResponse:
+    """Stream a spooled PDF in chunks and close the file once it has been sent"""
+    groesse = datei.seek(0, os.SEEK_END)
+    datei.seek(0)
+    return StreamingResponse(
+        iter(lambda: datei.read(PDF_CHUNK_BYTES), b""),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={dateiname}",
+            "Content-Length": str(groesse)
+        },
+        background=BackgroundTask(datei.close)
+    )
+
+def datei_antwort(datei, dateiname: str, content_type: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """Stream a file from the blob store chunk by chunk"""
+    async def chunks():
+        while chunk := await datei.readchunk():
+            yield chunk
+    
+    return StreamingResponse(
+        chunks(),
+        media_type=content_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={dateiname}",
+            "Content-Length": str(datei.length),
+            **(headers or {})
+        }
+    )
+
+async def archiv_datei_loeschen(datei_id: str):
+    try:
+        await db.dateien.delete(ObjectId(datei_id))
+    except NoFile:
+        pass
+
 @api_router.get("/arbeitsberichte/{bericht_id}/pdf")
-async def bericht_als_pdf_exportieren(bericht_id: str, current_user: Benutzer = Depends(get_current_user)):
+async def bericht_als_pdf_exportieren(bericht_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
     # Get report data
     bericht = await db.arbeitsberichte.find_one({"id": bericht_id})
     if not bericht:
@@ -596,6 +1129,18 @@ async def bericht_als_pdf_exportieren(bericht_id: str, current_user: Benutzer =
     if current_user.rolle != BenutzerRolle.ADMIN and bericht["techniker_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
+    filename = f"Arbeitsbericht_{bericht['nummer']}.pdf"
+    
+    # Finalized reports are served from the archive as rendered at completion
+    if archiv_aktuell(bericht):
+        archiv = bericht["archiv_pdf"]
+        try:
+            datei = await db.dateien.open_download_stream(ObjectId(archiv["datei_id"]))
+        except NoFile:
+            logger.warning(f"Archived PDF {archiv['datei_id']} of report {bericht_id} is missing, rendering it")
+        else:
+            return datei_antwort(datei, filename, "application/pdf", {"ETag": f'"{archiv["sha256"]}"'})
+    
     # Get customer data
     kunde = await db.kunden.find_one({"id": bericht["kunde_id"]})
     if not kunde:
@@ -604,15 +1149,10 @@ async def bericht_als_pdf_exportieren(bericht_id: str, current_user: Benutzer =
     # Generate PDF
     try:
         pdf_generator = HotiEnergieTechPDFGenerator()
-        pdf_data = pdf_generator.generate_work_report_pdf(bericht, kunde)
+        with metrics.PDF_DAUER.labels("arbeitsbericht").time():
+            datei = await pdf_rendern(pdf_generator.write_work_report_pdf, bericht, kunde)
         
-        filename = f"Arbeitsbericht_{bericht['nummer']}.pdf"
-        
-        return Response(
-            content=pdf_data,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        return pdf_antwort(datei, filename)
     except Exception as e:
         logger.error(f"PDF generation failed: {e}")
         # Return a simple response for now
@@ -622,26 +1162,133 @@ async def bericht_als_pdf_exportieren(bericht_id: str, current_user: Benutzer =
             headers={"Content-Disposition": f"attachment; filename=Bericht_{bericht['nummer']}.txt"}
         )
 
+@api_router.post("/arbeitsberichte/{bericht_id}/pdf/auftrag", status_code=202)
+async def bericht_pdf_auftrag(bericht_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    bericht = await db.arbeitsberichte.find_one({"id": bericht_id}, {"_id": 0, "techniker_id": 1})
+    if not bericht:
+        raise HTTPException(status_code=404, detail="Arbeitsbericht nicht gefunden")
+    
+    # Check permissions
+    if current_user.rolle != BenutzerRolle.ADMIN and bericht["techniker_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    
+    job_id = await job_queue.enqueue("pdf_erstellen", {"bericht_id": bericht_id}, PRIORITAET_HOCH, benutzer_id=current_user.id)
+    return {"job_id": job_id}
+
+@api_router.get("/arbeitsberichte/{bericht_id}/pruefbericht/pdf")
+async def pruefbericht_als_pdf_exportieren(bericht_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    bericht = await db.arbeitsberichte.find_one({"id": bericht_id}, {"_id": 0, "fotos": 0})
+    if not bericht:
+        raise HTTPException(status_code=404, detail="Arbeitsbericht nicht gefunden")
+    
+    # Check permissions
+    if current_user.rolle != BenutzerRolle.ADMIN and bericht["techniker_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    
+    if not bericht.get("pruefbericht_feuerung"):
+        raise HTTPException(status_code=404, detail="Kein Prüfbericht vorhanden")
+    
+    kunde = await db.kunden.find_one({"id": bericht["kunde_id"]})
+    if not kunde:
+        raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
+    
+    with metrics.PDF_DAUER.labels("pruefbericht").time():
+        datei = await pdf_rendern(HotiEnergieTechPDFGenerator().write_pruefbericht_pdf, bericht, kunde)
+    return pdf_antwort(datei, f"Pruefbericht_{bericht['nummer']}.pdf")
+
+@api_router.post("/pruefberichte/pdf/auftrag", status_code=202)
+async def pruefberichte_zip_auftrag(auftrag: PruefberichteAuftrag, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    # Rendered into one ZIP by the worker
+    if auftrag.von > auftrag.bis:
+        raise HTTPException(status_code=400, detail="Ungültiger Zeitraum")
+    
+    payload = {"von": auftrag.von.isoformat(), "bis": auftrag.bis.isoformat()}
+    # Technicians only get their own reports
+    if current_user.rolle != BenutzerRolle.ADMIN:
+        payload["techniker_id"] = current_user.id
+    
+    job_id = await job_queue.enqueue("pruefberichte_zip", payload, PRIORITAET_NORMAL, benutzer_id=current_user.id)
+    return {"job_id": job_id}
+
+# Background jobs
+async def get_job_for_user(job_id: str, current_user: AktuellerBenutzer) -> dict:
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Auftrag nicht gefunden")
+    if current_user.rolle != BenutzerRolle.ADMIN and job["benutzer_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    return job
+
+@api_router.get("/jobs/{job_id}")
+async def job_status(job_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    job = await get_job_for_user(job_id, current_user)
+    return trusted_response({
+        feld: job.get(feld)
+        for feld in ("id", "typ", "status", "versuche", "max_versuche", "fehler", "ergebnis", "erstellt_am", "abgeschlossen_am")
+    })
+
+@api_router.get("/jobs/{job_id}/ergebnis")
+async def job_ergebnis(job_id: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    job = await get_job_for_user(job_id, current_user)
+    ergebnis = job.get("ergebnis") or {}
+    if job["status"] != ERLEDIGT or "datei_id" not in ergebnis:
+        raise HTTPException(status_code=404, detail="Kein Ergebnis verfügbar")
+    
+    # The result file can expire shortly before its job document
+    try:
+        datei = await db.dateien.open_download_stream(ObjectId(ergebnis["datei_id"]))
+    except NoFile:
+        raise HTTPException(status_code=410, detail="Ergebnis ist abgelaufen")
+    return datei_antwort(datei, ergebnis["dateiname"], ergebnis.get("content_type", "application/octet-stream"))
+
 # Report Templates
+VORLAGEN_ADAPTER = TypeAdapter(List[BerichtVorlage])
+
+async def vorlagen_version_erhoehen():
+    """Call after every write to db.vorlagen so all workers reload their template cache"""
+    await db.versionen.update_one({"_id": "vorlagen"}, {"$inc": {"version": 1}}, upsert=True)
+    vorlagen_cache["version"] = None
+
+async def aktive_vorlagen() -> dict:
+    """Active templates and their response JSON, reloaded only when the shared version changed"""
+    jetzt = datetime.utcnow()
+    if vorlagen_cache["version"] is not None and jetzt < vorlagen_cache["geprueft"] + timedelta(seconds=VORLAGEN_VERSION_PRUEFEN_SEKUNDEN):
+        metrics.cache_zugriff("vorlagen", True)
+        return vorlagen_cache
+    
+    stand = await db.versionen.find_one({"_id": "vorlagen"})
+    version = stand["version"] if stand else 0
+    treffer = version == vorlagen_cache["version"]
+    metrics.cache_zugriff("vorlagen", treffer)
+    if not treffer:
+        vorlagen = await db.vorlagen.find({"aktiv": True}, {"_id": 0}).to_list(100)
+        with stufe("validierung.BerichtVorlage", "validierung", anzahl=len(vorlagen)):
+            modelle = [BerichtVorlage(**vorlage) for vorlage in vorlagen]
+        vorlagen_cache.update(
+            version=version, vorlagen=[modell.model_dump() for modell in modelle], json=VORLAGEN_ADAPTER.dump_json(modelle)
+        )
+    vorlagen_cache["geprueft"] = jetzt
+    return vorlagen_cache
+
 @api_router.get("/vorlagen", response_model=List[BerichtVorlage])
-async def vorlagen_abrufen(current_user: Benutzer = Depends(get_current_user)):
-    vorlagen = await db.vorlagen.find({"aktiv": True}).to_list(100)
-    return [BerichtVorlage(**vorlage) for vorlage in vorlagen]
+async def vorlagen_abrufen(current_user: AktuellerBenutzer = Depends(get_current_user)):
+    return Response(content=(await aktive_vorlagen())["json"], media_type="application/json")
 
 @api_router.post("/vorlagen", response_model=BerichtVorlage)
-async def vorlage_erstellen(vorlage_data: BerichtVorlage, current_user: Benutzer = Depends(get_current_user)):
+async def vorlage_erstellen(vorlage_data: BerichtVorlage, current_user: AktuellerBenutzer = Depends(get_current_user)):
     if current_user.rolle != BenutzerRolle.ADMIN:
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
-    await db.vorlagen.insert_one(vorlage_data.dict())
+    await db.vorlagen.insert_one(vorlage_data.model_dump())
+    await vorlagen_version_erhoehen()
     return vorlage_data
 
 # Calendar Integration
 @api_router.get("/kalender", response_model=List[KalenderTermin])
 async def kalender_termine_abrufen(
-    start_datum: Optional[str] = None,
-    end_datum: Optional[str] = None,
-    current_user: Benutzer = Depends(get_current_user)
+    start_datum: Optional[datetime] = None,
+    end_datum: Optional[datetime] = None,
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     filter_query = {}
     
@@ -649,32 +1296,89 @@ async def kalender_termine_abrufen(
     if current_user.rolle != BenutzerRolle.ADMIN:
         filter_query["techniker_id"] = current_user.id
     
-    # Date filtering
-    if start_datum:
-        filter_query["startzeit"] = {"$gte": datetime.fromisoformat(start_datum)}
-    if end_datum:
-        if "startzeit" in filter_query:
-            filter_query["startzeit"]["$lte"] = datetime.fromisoformat(end_datum)
-        else:
-            filter_query["startzeit"] = {"$lte": datetime.fromisoformat(end_datum)}
+    # Appointments overlapping the requested range, including those that started before it
+    start = naive_utc(start_datum)
+    ende = naive_utc(end_datum)
+    filter_query.update(overlap_filter(start, ende))
     
-    termine = await db.kalender.find(filter_query).sort("startzeit", 1).to_list(100)
-    return [KalenderTermin(**termin) for termin in termine]
+    # A bounded range returns every appointment in it; open ranges keep the previous cap
+    if not (start and ende):
+        termine = await db.kalender.find(filter_query).sort("startzeit", 1).to_list(100)
+        with stufe("validierung.KalenderTermin", "validierung", anzahl=len(termine)):
+            return [KalenderTermin(**termin) for termin in termine]
+    
+    # Series are expanded only for the requested window
+    termine = termine_expandieren(await db.kalender.find(filter_query).to_list(None), start, ende)
+    termine.sort(key=lambda t: t["startzeit"])
+    with stufe("validierung.KalenderTermin", "validierung", anzahl=len(termine)):
+        return [KalenderTermin(**termin) for termin in termine]
+
+@api_router.get("/kalender/verfuegbarkeit", response_model=List[TechnikerVerfuegbarkeit])
+async def kalender_verfuegbarkeit(
+    start_datum: datetime,
+    end_datum: datetime,
+    techniker_ids: Optional[str] = None,
+    min_dauer_minuten: int = 0,
+    current_user: AktuellerBenutzer = Depends(get_current_user)
+):
+    start = naive_utc(start_datum)
+    ende = naive_utc(end_datum)
+    if ende <= start:
+        raise HTTPException(status_code=400, detail="Enddatum muss nach dem Startdatum liegen")
+    
+    # Regular users only see their own availability
+    if current_user.rolle != BenutzerRolle.ADMIN:
+        ids = [current_user.id]
+    elif techniker_ids:
+        ids = [tid for tid in techniker_ids.split(",") if tid]
+    else:
+        techniker = await db.benutzer.find(
+            {"rolle": BenutzerRolle.TECHNIKER, "aktiv": True}, {"_id": 0, "id": 1}
+        ).to_list(None)
+        ids = [t["id"] for t in techniker]
+    
+    # One indexed query for all technicians, swept in (techniker_id, startzeit) order
+    termine = await db.kalender.find(
+        {"techniker_id": {"$in": ids}, "status": {"$nin": INAKTIVE_STATUS}, **overlap_filter(start, ende)},
+        {"_id": 0, "id": 1, "techniker_id": 1, "startzeit": 1, "endzeit": 1, "wiederholung": 1, "ausnahmen": 1}
+    ).to_list(None)
+    termine = termine_expandieren(termine, start, ende)
+    termine.sort(key=lambda t: (t["techniker_id"], t["startzeit"]))
+    
+    frei = freie_zeitfenster(termine, ids, start, ende, timedelta(minutes=min_dauer_minuten))
+    return [
+        TechnikerVerfuegbarkeit(
+            techniker_id=tid,
+            freie_zeitfenster=[Zeitfenster(start=s, ende=e) for s, e in slots]
+        )
+        for tid, slots in frei.items()
+    ]
 
 @api_router.post("/kalender", response_model=KalenderTermin)
-async def kalender_termin_erstellen(termin_data: KalenderTermin, current_user: Benutzer = Depends(get_current_user)):
+async def kalender_termin_erstellen(termin_data: KalenderTermin, current_user: AktuellerBenutzer = Depends(get_current_user)):
     # Set technician ID to current user if not admin
     if current_user.rolle != BenutzerRolle.ADMIN:
         termin_data.techniker_id = current_user.id
+    dokument = termin_dokument(termin_data)
     
-    await db.kalender.insert_one(termin_data.dict())
+    # Conflict check and insert happen under the technician's calendar lock
+    async with techniker_sperre(termin_data.techniker_id):
+        if termin_data.status not in INAKTIVE_STATUS:
+            konflikte = await find_termin_konflikte(dokument)
+            if konflikte:
+                raise_termin_konflikt(konflikte)
+        await db.kalender.insert_one(dokument)
+    event_bus.emit(
+        events.TERMIN_ERSTELLT, termin_id=termin_data.id, techniker_id=termin_data.techniker_id,
+        titel=termin_data.titel, startzeit=termin_data.startzeit, von_benutzer_id=current_user.id
+    )
     return termin_data
 
 @api_router.put("/kalender/{termin_id}", response_model=KalenderTermin)
 async def kalender_termin_aktualisieren(
     termin_id: str,
     termin_update: KalenderTermin,
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     termin = await db.kalender.find_one({"id": termin_id})
     if not termin:
@@ -684,19 +1388,109 @@ async def kalender_termin_aktualisieren(
     if current_user.rolle != BenutzerRolle.ADMIN and termin["techniker_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
-    update_dict = termin_update.dict()
+    # Keep the identity of the appointment; the body is a full KalenderTermin with fresh defaults.
+    # Exceptions of a series are kept unless the client sends them explicitly.
+    if "ausnahmen" not in termin_update.model_fields_set:
+        termin_update.ausnahmen = termin.get("ausnahmen", [])
+    update_dict = termin_dokument(termin_update)
+    update_dict["id"] = termin_id
+    del update_dict["erstellt_am"]
     update_dict["aktualisiert_am"] = datetime.utcnow()
     
-    await db.kalender.update_one({"id": termin_id}, {"$set": update_dict})
+    async with techniker_sperre(termin_update.techniker_id):
+        if termin_update.status not in INAKTIVE_STATUS:
+            konflikte = await find_termin_konflikte(update_dict, ausser_ids=(termin_id,))
+            if konflikte:
+                raise_termin_konflikt(konflikte)
+        await db.kalender.update_one({"id": termin_id}, {"$set": update_dict})
+    
+    event_bus.emit(
+        events.TERMIN_AKTUALISIERT, termin_id=termin_id,
+        techniker_ids=[termin["techniker_id"], update_dict["techniker_id"]]
+    )
+    if (termin["startzeit"], termin["endzeit"], termin["techniker_id"]) != (update_dict["startzeit"], update_dict["endzeit"], update_dict["techniker_id"]):
+        event_bus.emit(
+            events.TERMIN_VERSCHOBEN, termin_id=termin_id, techniker_id=update_dict["techniker_id"],
+            titel=update_dict["titel"], startzeit=update_dict["startzeit"], von_benutzer_id=current_user.id
+        )
     
     updated_termin = await db.kalender.find_one({"id": termin_id})
-    return KalenderTermin(**updated_termin)
+    with stufe("validierung.KalenderTermin", "validierung"):
+        return KalenderTermin(**updated_termin)
+
+async def get_serie_vorkommen(termin_id: str, original_startzeit: datetime, current_user: AktuellerBenutzer):
+    """Load a series and check that an active occurrence starts at original_startzeit"""
+    serie = await db.kalender.find_one({"id": termin_id}, {"_id": 0})
+    if not serie or not serie.get("wiederholung"):
+        raise HTTPException(status_code=404, detail="Terminserie nicht gefunden")
+    
+    # Check permissions
+    if current_user.rolle != BenutzerRolle.ADMIN and serie["techniker_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    
+    beginn = naive_utc(original_startzeit)
+    treffer = serie_expandieren(serie, beginn, beginn + timedelta(microseconds=1))
+    if not any(t["original_startzeit"] == beginn for t in treffer):
+        raise HTTPException(status_code=404, detail="Termin nicht gefunden")
+    return serie, beginn
+
+@api_router.delete("/kalender/{termin_id}/vorkommen")
+async def kalender_vorkommen_absagen(
+    termin_id: str,
+    original_startzeit: datetime,
+    current_user: AktuellerBenutzer = Depends(get_current_user)
+):
+    serie, beginn = await get_serie_vorkommen(termin_id, original_startzeit, current_user)
+    await db.kalender.update_one(
+        {"id": termin_id},
+        {"$addToSet": {"ausnahmen": beginn}, "$set": {"aktualisiert_am": datetime.utcnow()}}
+    )
+    event_bus.emit(events.TERMIN_AKTUALISIERT, termin_id=termin_id, techniker_ids=[serie["techniker_id"]])
+    return {"message": "Termin aus der Serie entfernt"}
+
+@api_router.put("/kalender/{termin_id}/vorkommen", response_model=KalenderTermin)
+async def kalender_vorkommen_aendern(
+    termin_id: str,
+    original_startzeit: datetime,
+    termin_update: KalenderTermin,
+    current_user: AktuellerBenutzer = Depends(get_current_user)
+):
+    serie, beginn = await get_serie_vorkommen(termin_id, original_startzeit, current_user)
+    
+    # The changed occurrence becomes a single appointment linked to its series
+    termin_update.wiederholung = None
+    termin_update.ausnahmen = []
+    termin_update.serie_id = termin_id
+    termin_update.original_startzeit = beginn
+    if current_user.rolle != BenutzerRolle.ADMIN:
+        termin_update.techniker_id = current_user.id
+    dokument = termin_dokument(termin_update)
+    
+    async with techniker_sperre(termin_update.techniker_id):
+        if termin_update.status not in INAKTIVE_STATUS:
+            konflikte = await find_termin_konflikte(dokument, ausser_ids=(vorkommen_id(termin_id, beginn),))
+            if konflikte:
+                raise_termin_konflikt(konflikte)
+        await db.kalender.insert_one(dokument)
+        await db.kalender.update_one(
+            {"id": termin_id},
+            {"$addToSet": {"ausnahmen": beginn}, "$set": {"aktualisiert_am": datetime.utcnow()}}
+        )
+    event_bus.emit(
+        events.TERMIN_AKTUALISIERT, termin_id=termin_id,
+        techniker_ids=[serie["techniker_id"], termin_update.techniker_id]
+    )
+    event_bus.emit(
+        events.TERMIN_VERSCHOBEN, termin_id=termin_update.id, techniker_id=termin_update.techniker_id,
+        titel=termin_update.titel, startzeit=termin_update.startzeit, von_benutzer_id=current_user.id
+    )
+    return termin_update
 
 # Push Notifications
 @api_router.post("/push/subscribe")
 async def push_abonnement_erstellen(
     subscription_data: dict,
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     abonnement = PushAbonnement(
         benutzer_id=current_user.id,
@@ -708,26 +1502,110 @@ async def push_abonnement_erstellen(
     await db.push_abonnements.delete_many({"benutzer_id": current_user.id})
     
     # Add new subscription
-    await db.push_abonnements.insert_one(abonnement.dict())
+    await db.push_abonnements.insert_one(abonnement.model_dump())
     
     return {"message": "Push-Benachrichtigungen aktiviert"}
 
 @api_router.post("/push/notify")
 async def push_benachrichtigung_senden(
     message: dict,
-    current_user: Benutzer = Depends(get_current_user)
+    current_user: AktuellerBenutzer = Depends(get_current_user)
 ):
     if current_user.rolle != BenutzerRolle.ADMIN:
         raise HTTPException(status_code=403, detail="Nicht berechtigt")
     
-    # Get all active subscriptions
-    abonnements = await db.push_abonnements.find().to_list(1000)
-    
-    # Here you would integrate with a push service like Firebase FCM
-    # For now, we'll just log the message
-    logger.info(f"Push notification sent: {message}")
+    if push_sender is None:
+        raise HTTPException(status_code=503, detail="Push-Benachrichtigungen sind nicht konfiguriert")
     
-    return {"message": f"Benachrichtigung an {len(abonnements)} Benutzer gesendet"}
+    # Delivery runs on a worker; the job status reports how many were sent
+    job_id = await job_queue.enqueue("push_senden", {"nachricht": message}, PRIORITAET_NORMAL, benutzer_id=current_user.id)
+    return ORJSONResponse(
+        status_code=202,
+        content={"message": "Benachrichtigung wird gesendet", "job_id": job_id}
+    )
+
+@api_router.get("/push/vapid-public-key")
+async def push_vapid_public_key():
+    if not VAPID_PUBLIC_KEY:
+        raise HTTPException(status_code=503, detail="Push-Benachrichtigungen sind nicht konfiguriert")
+    return {"public_key": VAPID_PUBLIC_KEY}
+
+# System
+@api_router.get("/system/datenbank-pool")
+async def datenbank_pool_status(current_user: AktuellerBenutzer = Depends(get_current_user)):
+    """Connection pool utilization of this worker process"""
+    if current_user.rolle != BenutzerRolle.ADMIN:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    return {"pid": os.getpid(), **db.pool_status()}
+
+@api_router.get("/system/profile")
+async def profile_abrufen(route: Optional[str] = None, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    """Stored request profiles, optionally for one route template"""
+    if current_user.rolle != BenutzerRolle.ADMIN:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    return await asyncio.get_running_loop().run_in_executor(None, profile_auflisten, PROFILER_VERZEICHNIS, route)
+
+@api_router.get("/system/profile/{profil_id}.{format}")
+async def profil_herunterladen(profil_id: str, format: str, current_user: AktuellerBenutzer = Depends(get_current_user)):
+    """Flame view (html) or pstats file of one profile"""
+    if current_user.rolle != BenutzerRolle.ADMIN:
+        raise HTTPException(status_code=403, detail="Nicht berechtigt")
+    datei = profil_datei(PROFILER_VERZEICHNIS, profil_id, format)
+    if datei is None:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden")
+    return FileResponse(datei, media_type=PROFIL_FORMATE[format], filename=datei.name)
+
+# Event subscribers
+@event_bus.subscribe(events.BERICHT_ERSTELLT, events.BERICHT_AKTUALISIERT, events.BERICHT_GELOESCHT)
+async def statistik_cache_invalidieren(event: events.DomainEvent):
+    statistik_cache.pop(event.daten["techniker_id"], None)
+    statistik_cache.pop("admin", None)
+
+@event_bus.subscribe(events.BERICHT_ABGESCHLOSSEN)
+async def admins_benachrichtigen(event: events.DomainEvent):
+    if push_sender is None:
+        return
+    admins = await db.benutzer.find({"rolle": BenutzerRolle.ADMIN, "aktiv": True}, {"_id": 0, "id": 1}).to_list(None)
+    await job_queue.enqueue("push_senden", {
+        "nachricht": {"title": "Arbeitsbericht abgeschlossen", "body": f"Bericht {event.daten['nummer']} wurde abgeschlossen"},
+        "filter": {"benutzer_id": {"$in": [a["id"] for a in admins]}}
+    }, PRIORITAET_NORMAL)
+
+@event_bus.subscribe(events.BERICHT_AKTUALISIERT, events.FOTO_HINZUGEFUEGT)
+async def pdf_archivieren(event: events.DomainEvent):
+    # Finalized reports get their PDF rendered once by the worker; later edits archive a new version
+    bericht = await db.arbeitsberichte.find_one({"id": event.daten["bericht_id"]}, {"_id": 0, "status": 1})
+    if bericht and ist_abgeschlossen(bericht):
+        await job_queue.enqueue("pdf_archivieren", {"bericht_id": event.daten["bericht_id"]}, PRIORITAET_NORMAL)
+
+@event_bus.subscribe(events.TERMIN_ERSTELLT, events.TERMIN_VERSCHOBEN)
+async def techniker_benachrichtigen(event: events.DomainEvent):
+    # Technicians don't need a notification about their own changes
+    if push_sender is None or event.daten["techniker_id"] == event.daten["von_benutzer_id"]:
+        return
+    aktion = "Neuer Termin" if event.typ == events.TERMIN_ERSTELLT else "Termin verschoben"
+    await job_queue.enqueue("push_senden", {
+        "nachricht": {"title": aktion, "body": f"{event.daten['titel']} am {ortszeit(event.daten['startzeit']):%d.%m.%Y %H:%M}"},
+        "filter": {"benutzer_id": event.daten["techniker_id"]}
+    }, PRIORITAET_NORMAL)
+
+# In-process live updates when Mongo has no change streams (standalone server)
+LIVE_EVENTS = {
+    events.BERICHT_ERSTELLT: ("arbeitsbericht", events.ERSTELLT),
+    events.BERICHT_AKTUALISIERT: ("arbeitsbericht", events.GEAENDERT),
+    events.FOTO_HINZUGEFUEGT: ("arbeitsbericht", events.GEAENDERT),
+    events.BERICHT_GELOESCHT: ("arbeitsbericht", events.GELOESCHT),
+    events.TERMIN_ERSTELLT: ("kalender", events.ERSTELLT),
+    events.TERMIN_AKTUALISIERT: ("kalender", events.GEAENDERT),
+}
+
+@event_bus.subscribe(*LIVE_EVENTS)
+async def live_weiterleiten(event: events.DomainEvent):
+    if change_stream_task is not None:
+        return
+    entitaet, aktion = LIVE_EVENTS[event.typ]
+    techniker_ids = event.daten.get("techniker_ids") or [event.daten["techniker_id"]]
+    live_broadcaster.publish(entitaet, aktion, event.daten.get("bericht_id") or event.daten.get("termin_id"), techniker_ids)
 
 # Configure logging early
 logging.basicConfig(
@@ -736,9 +1614,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def create_indexes():
+    # Expired refresh tokens are removed by MongoDB
+    await db.refresh_tokens.create_index("laeuft_ab", expireAfterSeconds=0)
+    await db.refresh_tokens.create_index("token_hash", unique=True)
+    await db.token_widerrufe.create_index("laeuft_ab", expireAfterSeconds=0)
+    # Calendar overlap and availability queries
+    await db.kalender.create_index([("techniker_id", 1), ("startzeit", 1), ("endzeit", 1)])
+    await db.kalender.create_index([("startzeit", 1), ("endzeit", 1)])
+    # Report list per customer and the previous Prüfbericht for new reports from a template
+    await db.arbeitsberichte.create_index([("kunde_id", 1), ("erstellt_am", -1)])
+    # Batch Prüfbericht export by date range
+    await db.arbeitsberichte.create_index("pruefbericht_feuerung.pruefdatum", sparse=True)
+    await job_queue.create_indexes()
+
+def change_stream_beendet(task: asyncio.Task):
+    """Fall back to in-process live updates when the change stream gave up"""
+    global change_stream_task
+    if task is not change_stream_task or task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.error("Change stream task crashed", exc_info=task.exception())
+    change_stream_task = None
+    live_broadcaster.resync_alle()
+
+async def start_event_bus():
+    global change_stream_task
+    await event_bus.start()
+    try:
+        mit_change_streams = await change_streams_verfuegbar(db)
+    except Exception as e:
+        logger.warning(f"Could not detect change stream support: {e}")
+        mit_change_streams = False
+    if mit_change_streams:
+        change_stream_task = asyncio.create_task(change_stream_verfolgen(db, live_broadcaster))
+        change_stream_task.add_done_callback(change_stream_beendet)
+    else:
+        logger.info("MongoDB has no change streams, live updates only cover this process")
+
+async def shutdown():
+    if change_stream_task is not None:
+        change_stream_task.cancel()
+    await event_bus.stop()
+    db.schliessen()
+    hash_executor.shutdown(wait=False)
+    if push_sender is not None:
+        await push_sender.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker process after gunicorn forked it, so each gets its own client and pool
+    tracing.tracing_einrichten("hoti-backend")
+    db.verbinden()
+    await create_indexes()
+    await start_event_bus()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+app = FastAPI(title="HotiEnergieTech Arbeitsberichts-App", lifespan=lifespan)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+if PROFILER_AKTIV:
+    app.add_middleware(
+        ProfilerMiddleware,
+        verzeichnis=PROFILER_VERZEICHNIS,
+        rate=float(os.getenv("PROFILER_RATE", "0.01")),
+        schwelle_ms=float(os.environ["PROFILER_SCHWELLE_MS"]) if os.getenv("PROFILER_SCHWELLE_MS") else None,
+        max_profile=int(os.getenv("PROFILER_MAX_PROFILE", "200")),
+        intervall_ms=float(os.getenv("PROFILER_INTERVALL_MS", "1")),
+        ausgenommen=("/api/events", "/metrics")
+    )
+app.add_middleware(metrics.PrometheusMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -747,6 +1699,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metriken(request: Request):
+    # Optional shared secret for the scraper
+    metrics_token = os.environ.get("METRICS_TOKEN")
+    if metrics_token and not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {metrics_token}"):
+        raise HTTPException(status_code=401, detail="Nicht berechtigt")
+    if db.client is not None:
+        metrics.pool_metriken_setzen(db.pool_status())
+    body, content_type = metrics.metriken_exportieren()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+from database import befehl_collection
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("hoti")
+
+# Span attribute naming the Server-Timing stage a span is counted towards
+STUFE = "hoti.stufe"
+VERSCHACHTELT = "hoti.stufe_verschachtelt"
+
+# TRACING_EXPORTER: "console" (stdout), "datei" (JSON lines to TRACING_DATEI) or unset (no export)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_DATEI = os.getenv("TRACING_DATEI", "traces.jsonl")
+SERVER_TIMING_AKTIV = os.getenv("SERVER_TIMING", "1") == "1"
+
+
+class Stufen:
+    """Time spent per stage within one request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.dauer: Dict[str, float] = defaultdict(float)
+        self.anzahl: Dict[str, int] = defaultdict(int)
+
+    def hinzufuegen(self, stufe: str, sekunden: float):
+        # Mongo spans end on Motor's executor threads
+        with self._lock:
+            self.dauer[stufe] += sekunden
+            self.anzahl[stufe] += 1
+
+    def server_timing(self, gesamt: float) -> str:
+        with self._lock:
+            eintraege = [
+                f'{stufe};dur={dauer * 1000:.1f};desc="{self.anzahl[stufe]}x"'
+                for stufe, dauer in self.dauer.items()
+            ]
+        eintraege.append(f"total;dur={gesamt * 1000:.1f}")
+        return ", ".join(eintraege)
+
+
+# Stages of the request being handled; Motor copies the context into its executor threads
+_stufen: ContextVar[Optional[Stufen]] = ContextVar("stufen", default=None)
+
+
+class ServerTimingProcessor(SpanProcessor):
+    """Adds the duration of every finished stage span to its request's Stufen.
+
+    A span nested in a span of the same stage is already covered by its parent."""
+
+    def on_start(self, span, parent_context=None):
+        stufe = span.attributes.get(STUFE)
+        eltern = trace.get_current_span(parent_context)
+        if stufe and getattr(eltern, "attributes", {}).get(STUFE) == stufe:
+            span.set_attribute(VERSCHACHTELT, True)
+
+    def on_end(self, span):
+        stufe = span.attributes.get(STUFE)
+        stufen = _stufen.get()
+        if stufe and stufen is not None and not span.attributes.get(VERSCHACHTELT):
+            stufen.hinzufuegen(stufe, (span.end_time - span.start_time) / 1e9)
+
+
+def stufe(name: str, stufe: str, **attributes):
+    """Span counted towards a Server-Timing stage; usable as context manager and decorator"""
+    return tracer.start_as_current_span(name, attributes={STUFE: stufe, **attributes})
+
+
+def tracing_einrichten(service_name: str):
+    """Install the tracer provider for this process (call after forking)"""
+    if isinstance(trace.get_tracer_provider(), TracerProvider):
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(ServerTimingProcessor())
+    if TRACING_EXPORTER == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    elif TRACING_EXPORTER == "datei":
+        datei = open(TRACING_DATEI, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=datei, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    elif TRACING_EXPORTER:
+        logger.warning(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER}, spans are not exported")
+    trace.set_tracer_provider(provider)
+
+
+class MongoTracing(monitoring.CommandListener):
+    """One client span per MongoDB command, child of the span that issued the call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def started(self, event):
+        span = tracer.start_span(
+            f"mongodb.{event.command_name}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": befehl_collection(event),
+                STUFE: "mongo"
+            }
+        )
+        with self._lock:
+            self._spans[event.request_id] = span
+
+    def _beenden(self, event, fehler: Optional[str] = None):
+        with self._lock:
+            span = self._spans.pop(event.request_id, None)
+        if span is None:
+            return
+        if fehler is not None:
+            span.set_status(Status(StatusCode.ERROR, fehler))
+        span.end()
+
+    def succeeded(self, event):
+        self._beenden(event)
+
+    def failed(self, event):
+        self._beenden(event, str(event.failure.get("errmsg", "")))
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the server span of each request and adding the
+    Server-Timing header that summarizes the stage spans recorded below it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stufen = Stufen()
+        token = _stufen.set(stufen)
+        try:
+            with tracer.start_as_current_span(
+                f"{scope['method']} {scope['path']}",
+                kind=SpanKind.SERVER,
+                attributes={"http.method": scope["method"], "http.target": scope["path"]}
+            ) as span:
+                async def send_wrapper(message):
+                    if message["type"] == "http.response.start":
+                        route = scope.get("route")
+                        if route is not None:
+                            span.update_name(f"{scope['method']} {route.path}")
+                            span.set_attribute("http.route", route.path)
+                        span.set_attribute("http.status_code", message["status"])
+                        if SERVER_TIMING_AKTIV:
+                            headers = MutableHeaders(scope=message)
+                            headers.append("Server-Timing", stufen.server_timing(time.perf_counter() - start))
+                    await send(message)
+
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _stufen.reset(token)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Background worker for slow tasks (PDF rendering, push delivery).
+
+Run one or more instances next to the API, e.g.:
+    python worker.py --concurrency 2
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from job_queue import AUFBEWAHRUNG, JobAbbruch, JobWorker
+import metrics
+import tracing
+from pdf_generator import PDF_SPOOL_BYTES, pruefbericht_pdf
+from server import (
+    db, job_queue, push_sender, HotiEnergieTechPDFGenerator, archiv_datei_loeschen, archiv_aktuell,
+    ist_abgeschlossen, spool_pdf
+)
+
+logger = logging.getLogger("worker")
+
+# Process pool for batch PDF rendering, created in main()
+pdf_prozesse: ProcessPoolExecutor = None
+# Reports handed to the pool at once; finished PDFs are zipped before the next batch
+PDF_BATCH_GROESSE = 32
+
+
+async def pdf_erstellen(payload):
+    bericht = await db.arbeitsberichte.find_one({"id": payload["bericht_id"]})
+    if not bericht:
+        raise JobAbbruch("Arbeitsbericht nicht gefunden")
+    kunde = await db.kunden.find_one({"id": bericht["kunde_id"]})
+    if not kunde:
+        raise JobAbbruch("Kunde nicht gefunden")
+
+    # ReportLab is CPU bound; keep the event loop free for lease heartbeats
+    with metrics.PDF_DAUER.labels("arbeitsbericht").time():
+        datei = await asyncio.get_running_loop().run_in_executor(
+            None, spool_pdf, HotiEnergieTechPDFGenerator().write_work_report_pdf, bericht, kunde
+        )
+    dateiname = f"Arbeitsbericht_{bericht['nummer']}.pdf"
+    with datei:
+        datei_id = await db.dateien.upload_from_stream(dateiname, datei, metadata={
+            "content_type": "application/pdf",
+            "bericht_id": bericht["id"],
+            "loeschen_ab": datetime.utcnow() + AUFBEWAHRUNG
+        })
+    return {"datei_id": str(datei_id), "dateiname": dateiname, "content_type": "application/pdf"}
+
+
+async def pdf_archivieren(payload):
+    bericht = await db.arbeitsberichte.find_one({"id": payload["bericht_id"]}, {"_id": 0})
+    if not bericht or not ist_abgeschlossen(bericht):
+        return {"archiviert": False}
+    if archiv_aktuell(bericht):
+        return {"archiviert": True, **bericht["archiv_pdf"]}
+    kunde = await db.kunden.find_one({"id": bericht["kunde_id"]})
+    if not kunde:
+        raise JobAbbruch("Kunde nicht gefunden")
+
+    with metrics.PDF_DAUER.labels("arbeitsbericht").time():
+        datei = await asyncio.get_running_loop().run_in_executor(
+            None, spool_pdf, HotiEnergieTechPDFGenerator().write_work_report_pdf, bericht, kunde
+        )
+    with datei:
+        sha256 = hashlib.sha256()
+        for chunk in iter(lambda: datei.read(1024 * 1024), b""):
+            sha256.update(chunk)
+        groesse = datei.tell()
+        datei.seek(0)
+        datei_id = await db.dateien.upload_from_stream(f"Arbeitsbericht_{bericht['nummer']}.pdf", datei, metadata={
+            "content_type": "application/pdf",
+            "bericht_id": bericht["id"],
+            "sha256": sha256.hexdigest()
+        })
+
+    archiv = {
+        "datei_id": str(datei_id),
+        "sha256": sha256.hexdigest(),
+        "groesse": groesse,
+        "stand": bericht["aktualisiert_am"],
+        "erstellt_am": datetime.utcnow()
+    }
+    # Only attach it if the report wasn't edited while rendering (the edit queued its own job)
+    # and no other job archived this version meanwhile; the losing job deletes its own upload
+    vorheriges = bericht.get("archiv_pdf")
+    ergebnis = await db.arbeitsberichte.update_one(
+        {
+            "id": bericht["id"],
+            "aktualisiert_am": bericht["aktualisiert_am"],
+            **({"archiv_pdf.datei_id": vorheriges["datei_id"]} if vorheriges else {"archiv_pdf": None})
+        },
+        {"$set": {"archiv_pdf": archiv}}
+    )
+    if ergebnis.modified_count == 0:
+        await archiv_datei_loeschen(archiv["datei_id"])
+        return {"archiviert": False}
+    if vorheriges:
+        await archiv_datei_loeschen(vorheriges["datei_id"])
+    return {"archiviert": True, **archiv}
+
+
+async def pruefberichte_zip(payload):
+    filter_query = {"pruefbericht_feuerung.pruefdatum": {"$gte": payload["von"], "$lte": payload["bis"]}}
+    if "techniker_id" in payload:
+        filter_query["techniker_id"] = payload["techniker_id"]
+    # Photos are not part of a Prüfbericht and would only be pickled to the render processes
+    berichte = await db.arbeitsberichte.find(filter_query, {"_id": 0, "fotos": 0}).sort("nummer", 1).to_list(None)
+    if not berichte:
+        raise JobAbbruch("Keine Prüfberichte im Zeitraum")
+    kunden = {
+        kunde["id"]: kunde
+        async for kunde in db.kunden.find({"id": {"$in": list({b["kunde_id"] for b in berichte})}}, {"_id": 0})
+    }
+
+    loop = asyncio.get_running_loop()
+    datei = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_BYTES)
+    with datei:
+        with metrics.PDF_DAUER.labels("pruefberichte_zip").time(), zipfile.ZipFile(datei, "w", zipfile.ZIP_STORED) as archiv:
+            for start in range(0, len(berichte), PDF_BATCH_GROESSE):
+                teil = berichte[start:start + PDF_BATCH_GROESSE]
+                pdfs = await asyncio.gather(*(
+                    loop.run_in_executor(pdf_prozesse, pruefbericht_pdf, bericht, kunden.get(bericht["kunde_id"], {}))
+                    for bericht in teil
+                ))
+                for bericht, pdf in zip(teil, pdfs):
+                    archiv.writestr(f"Pruefbericht_{bericht['nummer']}.pdf", pdf)
+        datei.seek(0)
+
+        dateiname = f"Pruefberichte_{payload['von']}_{payload['bis']}.zip"
+        datei_id = await db.dateien.upload_from_stream(dateiname, datei, metadata={
+            "content_type": "application/zip",
+            "loeschen_ab": datetime.utcnow() + AUFBEWAHRUNG
+        })
+    return {"datei_id": str(datei_id), "dateiname": dateiname, "content_type": "application/zip", "anzahl": len(berichte)}
+
+
+async def push_senden(payload):
+    if push_sender is None:
+        raise JobAbbruch("Push-Benachrichtigungen sind nicht konfiguriert")
+    return await push_sender.senden(db, payload["nachricht"], payload.get("filter"))
+
+
+HANDLERS = {
+    "pdf_erstellen": pdf_erstellen,
+    "pdf_archivieren": pdf_archivieren,
+    "pruefberichte_zip": pruefberichte_zip,
+    "push_senden": push_senden,
+}
+
+
+async def ergebnisse_aufraeumen(intervall_sekunden: int = 600):
+    """Delete expired job result files (GridFS removes their chunks as well)"""
+    while True:
+        # A failed pass must not end the task; nothing awaits it before shutdown
+        try:
+            async for datei in db.dateien.find({"metadata.loeschen_ab": {"$lt": datetime.utcnow()}}):
+                await db.dateien.delete(datei._id)
+        except Exception:
+            logger.exception("Cleaning up expired job results failed, retrying next interval")
+        await asyncio.sleep(intervall_sekunden)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=2, help="Jobs processed in parallel by this process")
+    parser.add_argument("--typen", help="Comma separated job types to process (default: all)")
+    parser.add_argument("--pdf-prozesse", type=int, default=os.cpu_count(), help="Processes for batch PDF rendering")
+    args = parser.parse_args()
+
+    handlers = HANDLERS
+    if args.typen:
+        handlers = {typ: HANDLERS[typ] for typ in args.typen.split(",")}
+
+    global pdf_prozesse
+    # spawn: forking would copy the event loop and the driver's threads
+    pdf_prozesse = ProcessPoolExecutor(args.pdf_prozesse, mp_context=multiprocessing.get_context("spawn"))
+
+    tracing.tracing_einrichten("hoti-worker")
+    db.verbinden()
+    await job_queue.create_indexes()
+    worker = JobWorker(job_queue, handlers, concurrency=args.concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    aufraeumen = asyncio.create_task(ergebnisse_aufraeumen())
+    try:
+        await worker.run()
+    finally:
+        aufraeumen.cancel()
+        if push_sender is not None:
+            await push_sender.close()
+        db.schliessen()
+        pdf_prozesse.shutdown(cancel_futures=True)
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
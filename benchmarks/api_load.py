@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Load test: throughput and p50/p95/p99 latency of the main API operations
+
+Scenarios: login, liste, detail, update, upload, pdf. Each runs --requests
+requests with --concurrency parallel clients.
+
+Targets:
+  (default)  the app in-process on mongomock-motor, seeded with seed_data.py.
+             Needs no servers and measures the application code; Mongo costs
+             are not representative. GridFS (job results) is not available.
+  --url URL  a running server, e.g. uvicorn against a local mongod seeded with
+             `python benchmarks/seed_data.py --drop` (same --seed and counts).
+
+Results are written to benchmarks/results/<timestamp>.json. With --vergleich
+the run is compared with an earlier result and exits with 1 when a p95
+regressed by more than --toleranz percent.
+
+Usage: python benchmarks/api_load.py [--url http://localhost:8001] [--requests 200] [--concurrency 10]
+           [--szenarien liste,detail] [--berichte 500] [--vergleich benchmarks/results/baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+import httpx
+
+import seed_data
+
+ERGEBNIS_VERZEICHNIS = Path(__file__).resolve().parent / "results"
+SZENARIEN = ["login", "liste", "detail", "update", "upload", "pdf"]
+
+
+def perzentil(werte: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    index = max(0, min(len(werte) - 1, int(round(p / 100 * len(werte) + 0.5)) - 1))
+    return werte[index]
+
+
+class Kontext:
+    """Shared state of a run: ids to pick from and the admin token"""
+
+    def __init__(self, bericht_ids: List[str], benutzer: List[str], token: str, foto: bytes, seed_wert: int):
+        self.bericht_ids = bericht_ids
+        self.benutzer = benutzer
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.foto = foto
+        self.rng = random.Random(seed_wert)
+
+    def bericht_id(self) -> str:
+        return self.rng.choice(self.bericht_ids)
+
+
+async def login(client: httpx.AsyncClient, ctx: Kontext) -> httpx.Response:
+    return await client.post("/api/auth/anmelden", json={
+        "benutzername": ctx.rng.choice(ctx.benutzer), "passwort": seed_data.PASSWORT
+    })
+
+
+async def liste(client: httpx.AsyncClient, ctx: Kontext) -> httpx.Response:
+    return await client.get("/api/arbeitsberichte", params={"limit": 50}, headers=ctx.headers)
+
+
+async def detail(client: httpx.AsyncClient, ctx: Kontext) -> httpx.Response:
+    return await client.get(f"/api/arbeitsberichte/{ctx.bericht_id()}", headers=ctx.headers)
+
+
+async def update(client: httpx.AsyncClient, ctx: Kontext) -> httpx.Response:
+    return await client.put(f"/api/arbeitsberichte/{ctx.bericht_id()}", headers=ctx.headers, json={
+        "durchgefuehrte_arbeiten": f"Wartung durchgeführt ({time.time():.0f})"
+    })
+
+
+async def upload(client: httpx.AsyncClient, ctx: Kontext) -> httpx.Response:
+    return await client.post(
+        f"/api/arbeitsberichte/{ctx.bericht_id()}/fotos",
+        headers=ctx.headers,
+        files={"foto": ("bench.jpg", ctx.foto, "image/jpeg")},
+        data={"beschreibung": "Benchmark"}
+    )
+
+
+async def pdf(client: httpx.AsyncClient, ctx: Kontext) -> httpx.Response:
+    return await client.get(f"/api/arbeitsberichte/{ctx.bericht_id()}/pdf", headers=ctx.headers)
+
+
+async def szenario_ausfuehren(client: httpx.AsyncClient, ctx: Kontext, szenario, anfragen: int, concurrency: int) -> Dict[str, Any]:
+    latenzen: List[float] = []
+    fehler = {"anzahl": 0}
+    offen = iter(range(anfragen))
+
+    async def arbeiter():
+        for _ in offen:
+            start = time.perf_counter()
+            try:
+                response = await szenario(client, ctx)
+                if response.status_code >= 400:
+                    fehler["anzahl"] += 1
+            except httpx.HTTPError:
+                fehler["anzahl"] += 1
+            latenzen.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(arbeiter() for _ in range(concurrency)))
+    dauer = time.perf_counter() - start
+    latenzen.sort()
+    return {
+        "anfragen": anfragen,
+        "fehler": fehler["anzahl"],
+        "durchsatz_rps": round(anfragen / dauer, 1),
+        "p50_ms": round(perzentil(latenzen, 50), 2),
+        "p95_ms": round(perzentil(latenzen, 95), 2),
+        "p99_ms": round(perzentil(latenzen, 99), 2),
+        "mean_ms": round(statistics.mean(latenzen), 2),
+        "max_ms": round(latenzen[-1], 2),
+    }
+
+
+async def anmelden(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/auth/anmelden", json={
+        "benutzername": seed_data.ADMIN_BENUTZERNAME, "passwort": seed_data.PASSWORT
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def bericht_ids_laden(client: httpx.AsyncClient, token: str, anzahl: int) -> List[str]:
+    ids = []
+    while len(ids) < anzahl:
+        response = await client.get(
+            "/api/arbeitsberichte", params={"skip": len(ids), "limit": 50},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+        if not response.json():
+            break
+        ids.extend(b["id"] for b in response.json())
+    return ids
+
+
+async def lauf(args, client: httpx.AsyncClient, bericht_ids: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    token = await anmelden(client)
+    if bericht_ids is None:
+        bericht_ids = await bericht_ids_laden(client, token, args.berichte)
+    benutzer = [seed_data.TECHNIKER_BENUTZERNAME.format(n) for n in range(args.techniker)] or [seed_data.ADMIN_BENUTZERNAME]
+    foto = seed_data.base64.b64decode(seed_data.make_foto(random.Random(args.seed), args.foto_kb))
+    ctx = Kontext(bericht_ids, benutzer, token, foto, args.seed)
+
+    ergebnisse = {}
+    for name in args.szenarien.split(","):
+        szenario = globals()[name]
+        # One unmeasured request warms up caches and lazy imports
+        await szenario(client, ctx)
+        ergebnisse[name] = await szenario_ausfuehren(client, ctx, szenario, args.requests, args.concurrency)
+        e = ergebnisse[name]
+        print(f"   {name:<8} {e['durchsatz_rps']:>8} req/s   p50 {e['p50_ms']:>9} ms   p95 {e['p95_ms']:>9} ms   "
+              f"p99 {e['p99_ms']:>9} ms   errors {e['fehler']}")
+    return ergebnisse
+
+
+async def in_process(args) -> Dict[str, Dict[str, Any]]:
+    """Run against the app on mongomock-motor; the stand-in must be patched in before server is imported"""
+    import motor.motor_asyncio
+    import mongomock_motor
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "hoti_bench")
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+    import database
+    database.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    # GridFS needs a real Motor database
+    database.AsyncIOMotorGridFSBucket = lambda *args, **kwargs: None
+    import server
+    # server configures INFO logging; one line per request would drown the results
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async with server.lifespan(server.app):
+        daten = await seed_data.seed(
+            server.db, args.kunden, args.techniker, args.berichte, args.fotos, args.foto_kb, args.seed
+        )
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            return await lauf(args, client, daten["bericht_ids"])
+
+
+async def remote(args) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+        return await lauf(args, client)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def vergleichen(basis: Dict[str, Any], aktuell: Dict[str, Any], toleranz: float) -> bool:
+    """Print the change against a previous run; True when any p95 regressed beyond the tolerance"""
+    regression = False
+    print(f"📈 Compared with {basis['commit'] or '?'} from {basis['zeitpunkt']}")
+    for name, werte in aktuell["szenarien"].items():
+        alt = basis["szenarien"].get(name)
+        if not alt:
+            continue
+        aenderung = (werte["p95_ms"] - alt["p95_ms"]) / alt["p95_ms"] * 100
+        markierung = "❌" if aenderung > toleranz else "✅"
+        regression |= aenderung > toleranz
+        print(f"   {markierung} {name:<8} p95 {alt['p95_ms']:>9} → {werte['p95_ms']:>9} ms ({aenderung:+.1f}%)   "
+              f"throughput {alt['durchsatz_rps']} → {werte['durchsatz_rps']} req/s")
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process on mongomock)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--szenarien", default=",".join(SZENARIEN))
+    parser.add_argument("--kunden", type=int, default=50)
+    parser.add_argument("--techniker", type=int, default=5)
+    parser.add_argument("--berichte", type=int, default=500)
+    parser.add_argument("--fotos", type=int, default=3, help="Photos per report")
+    parser.add_argument("--foto-kb", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ausgabe", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--vergleich", help="Earlier result file to compare with")
+    parser.add_argument("--toleranz", type=float, default=10.0, help="Allowed p95 regression in percent")
+    args = parser.parse_args()
+
+    unbekannt = set(args.szenarien.split(",")) - set(SZENARIEN)
+    if unbekannt:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unbekannt))}")
+
+    ziel = args.url or "in-process (mongomock)"
+    print(f"🚀 API load test against {ziel}: {args.requests} requests per scenario, concurrency {args.concurrency}")
+    szenarien = asyncio.run(remote(args) if args.url else in_process(args))
+
+    ergebnis = {
+        "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "ziel": ziel,
+        "python": platform.python_version(),
+        "parameter": {k: v for k, v in vars(args).items() if k not in ("ausgabe", "vergleich")},
+        "szenarien": szenarien,
+    }
+    ausgabe = Path(args.ausgabe) if args.ausgabe else ERGEBNIS_VERZEICHNIS / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    ausgabe.parent.mkdir(parents=True, exist_ok=True)
+    ausgabe.write_text(json.dumps(ergebnis, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Results written to {ausgabe}")
+
+    if args.vergleich:
+        basis = json.loads(Path(args.vergleich).read_text(encoding="utf-8"))
+        if vergleichen(basis, ergebnis, args.toleranz):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
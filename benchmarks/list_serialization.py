@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serialization latency of GET /api/arbeitsberichte for a page of 50 reports
+
+Compares the previous path (Arbeitsbericht(**doc) per row, then FastAPI re-validating
+and encoding the list for response_model) with the trusted orjson path used now.
+
+Usage: python benchmarks/list_serialization.py [--reports 50] [--runs 200]
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# server.py reads these at import time; no connection is opened by the benchmark
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from pydantic import TypeAdapter
+from typing import List
+
+import server
+from server import Arbeitsbericht, normalize_bericht, trusted_response
+
+
+def make_bericht(i: int) -> dict:
+    """Build a stored report document with nested photos, work times and a Prüfbericht"""
+    return {
+        "id": str(uuid.uuid4()),
+        "nummer": f"AB-2025-{i:04d}",
+        "kunde_id": str(uuid.uuid4()),
+        "kunde_firmenname": f"Kunde {i} GmbH",
+        "projektleiter": "info@hotienergietec.at",
+        "komm_nr": f"K-{i}",
+        "durchgefuehrte_arbeiten": "Wartung der Gastherme, Abgasmessung und Dichtheitsprüfung. " * 5,
+        "arbeitszeiten": [
+            {"name": "Techniker", "datum": "2025-03-01", "beginn": "08:00", "ende": "12:00", "pause": 15,
+             "arbeitszeit": "3:45", "wegzeit": "0:30", "normal": "3:45", "ue50": "0", "ue100": "0"}
+            for _ in range(5)
+        ],
+        "materialien": [
+            {"menge": n + 1, "einheit": "Stk", "bezeichnung": f"Dichtung {n}"} for n in range(10)
+        ],
+        "fotos": [
+            {"id": str(uuid.uuid4()), "filename": f"foto{n}.jpg",
+             "data": base64.b64encode(os.urandom(3000)).decode("ascii"), "beschreibung": "Kessel"}
+            for n in range(3)
+        ],
+        "arbeit_abgeschlossen": True,
+        "offene_arbeiten": None,
+        "verrechnung": "Regie",
+        "unterschrift_kunde": None,
+        "status": "abgeschlossen",
+        "techniker_id": str(uuid.uuid4()),
+        "techniker_name": "Max Muster",
+        "erstellt_am": datetime(2025, 3, 1, 8, 0, 0, 123000),
+        "aktualisiert_am": datetime(2025, 3, 1, 12, 0, 0, 456000),
+        "pruefbericht_feuerung": {
+            "pruefnummer": "P-1", "pruefdatum": "2025-03-01", "befund_nr": "B-1", "zeichen": "", "dvr": "",
+            "feuerungsanlage": {"adresse_anlage": "Wien", "art": "Gas", "fabrikat_type": "Vaillant",
+                                "leistung_kw": "24", "aufstellungsort": "Keller", "brennstoff": "Erdgas"},
+            "messgeraet": {"fabrikat": "Testo", "typenbezeichnung": "330", "kalibrierstelle": "X",
+                           "letztkalibrierung": "2024-12-01"},
+            "anlass": {"erstmalige_einfache": False, "wiederkehrende_pruefung": True,
+                       "maengelbehebung": False, "ausserordentliche_pruefung": False},
+            "messwerte": {"abgastemperatur": "120", "verbrennungslufttemperatur": "20", "co2_o2_gehalt": "9.5",
+                          "co_gehalt": "12", "kesseltemperatur": "65", "foerderdruck": "-5", "russzahl": "0",
+                          "abgasverlust_wert": "5", "abgasverlust_grenzwert": "10", "nox_gehalt_wert": "80",
+                          "nox_gehalt_grenzwert": "120", "co_gehalt_3o2_wert": "15", "co_gehalt_3o2_grenzwert": "100"},
+            "maengel": {"maengel_vorhanden": False, "behebung_bis": "", "art_maengel_bemerkung": ""},
+        },
+    }
+
+
+def validated_path(docs: List[dict], adapter: TypeAdapter) -> bytes:
+    """Previous behaviour: build models in the handler, FastAPI validates and encodes again"""
+    models = [Arbeitsbericht(**dict(doc)) for doc in docs]
+    content = [m.model_dump() for m in models]
+    validated = adapter.validate_python(content)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+
+def trusted_path(docs: List[dict]) -> bytes:
+    """Current behaviour: normalize stored documents and encode them with orjson"""
+    return trusted_response([normalize_bericht(dict(doc)) for doc in docs]).body
+
+
+def measure(fn, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = [make_bericht(i) for i in range(args.reports)]
+    adapter = TypeAdapter(List[Arbeitsbericht])
+
+    # Both paths must produce the same payload
+    assert json.loads(validated_path(docs, adapter)) == json.loads(trusted_path(docs)), "payload mismatch"
+
+    results = {
+        "validated": measure(lambda: validated_path(docs, adapter), args.runs),
+        "trusted_orjson": measure(lambda: trusted_path(docs), args.runs),
+    }
+    print(f"📊 List serialization, {args.reports} reports, {args.runs} runs")
+    for name, stats in results.items():
+        print(f"   {name:<15} p50 {stats['p50_ms']:>8} ms   p95 {stats['p95_ms']:>8} ms   mean {stats['mean_ms']:>8} ms")
+    speedup = results["validated"]["p50_ms"] / results["trusted_orjson"]["p50_ms"]
+    print(f"   speedup (p50): {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
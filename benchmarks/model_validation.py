@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Pydantic validation and serialization of Arbeitsbericht for a page of 50 reports
+
+Measures the model work on the report hot paths: validating stored documents,
+validating and dumping a full update request body with Prüfbericht, and
+serializing validated models to JSON. trusted_json is the path taken for
+documents read from MongoDB (normalize_bericht + orjson, no model at all) and
+is the reference the model paths are compared with.
+
+Usage: python benchmarks/model_validation.py [--reports 50] [--runs 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# server.py reads these at import time; no connection is opened by the benchmark
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+import seed_data
+from server import Arbeitsbericht, ArbeitsberichtUpdate, normalize_bericht
+
+# Built once, like FastAPI does for a response_model
+ARBEITSBERICHTE_ADAPTER = TypeAdapter(List[Arbeitsbericht])
+
+
+def make_docs(anzahl: int) -> list:
+    rng = random.Random(42)
+    kunde = seed_data.make_kunde(rng, 1)
+    techniker = {"id": seed_data.make_id(rng), "vollname": "Max Muster"}
+    fotos = [seed_data.make_foto(rng, 20) for _ in range(3)]
+    return [seed_data.make_bericht(rng, i, kunde, techniker, fotos, mit_pruefbericht=True) for i in range(anzahl)]
+
+
+def measure(fn, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = make_docs(args.reports)
+    modelle = [Arbeitsbericht.model_validate(doc) for doc in docs]
+    update_bodies = [
+        json.dumps({feld: doc[feld] for feld in ("durchgefuehrte_arbeiten", "arbeitszeiten", "materialien", "pruefbericht_feuerung")})
+        for doc in docs
+    ]
+
+    results = {
+        "validate_docs": measure(lambda: [Arbeitsbericht.model_validate(doc) for doc in docs], args.runs),
+        "validate_list": measure(lambda: ARBEITSBERICHTE_ADAPTER.validate_python(docs), args.runs),
+        "dump_json": measure(lambda: ARBEITSBERICHTE_ADAPTER.dump_json(modelle), args.runs),
+        "trusted_json": measure(lambda: orjson.dumps([normalize_bericht(dict(doc)) for doc in docs]), args.runs),
+        "update_body": measure(
+            lambda: [ArbeitsberichtUpdate.model_validate_json(body).model_dump() for body in update_bodies], args.runs
+        ),
+    }
+    print(f"📊 Arbeitsbericht models, {args.reports} reports, {args.runs} runs")
+    for name, stats in results.items():
+        print(f"   {name:<15} p50 {stats['p50_ms']:>8} ms   p95 {stats['p95_ms']:>8} ms   mean {stats['mean_ms']:>8} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HotiEnergieTechPDFGenerator.generate_work_report_pdf on synthetic reports of increasing size
+
+Every case is rendered offline (no server, no database) and measured for render
+time, peak Python memory (tracemalloc) and output size. The page structure of
+each PDF is compared with a golden file in benchmarks/golden/pdf/: which
+flowable landed on which page at which height, with the text of paragraphs and
+table cells and the size of images. A render optimization must not change it.
+
+After an intended layout change, review the diff and run with --golden-aktualisieren.
+
+Usage: python benchmarks/pdf_generation.py [--runs 5] [--faelle klein,gross+pb] [--golden-aktualisieren]
+           [--ausgabe benchmarks/results/pdf.json] [--vergleich benchmarks/results/pdf-baseline.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from reportlab.platypus import Image, Paragraph, Spacer, Table
+from reportlab.platypus.doctemplate import ActionFlowable, BaseDocTemplate
+
+import pdf_generator
+import seed_data
+from pdf_generator import HotiEnergieTechPDFGenerator
+
+GOLDEN_VERZEICHNIS = Path(__file__).resolve().parent / "golden" / "pdf"
+
+# name: (work-time rows, materials, photos)
+GROESSEN = {
+    "leer": (0, 0, 0),
+    "klein": (3, 5, 2),
+    "mittel": (10, 25, 4),
+    "gross": (25, 50, 10),
+    "maximal": (50, 100, 20),
+    "zeilen500": (500, 500, 0),
+}
+FAELLE = [f"{name}{suffix}" for name in GROESSEN for suffix in ("", "+pb")]
+
+
+class FesteZeit(datetime):
+    """The signature section prints today's date; goldens need a fixed one"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 3, 1, 12, 0, 0)
+
+
+def make_fall(name: str) -> tuple:
+    """Report and customer document for a case like "gross+pb" """
+    groesse, _, pb = name.partition("+")
+    zeiten, materialien, fotos = GROESSEN[groesse]
+    rng = random.Random(name)
+    kunde = seed_data.make_kunde(rng, 1)
+    techniker = {"id": seed_data.make_id(rng), "vollname": "Max Muster"}
+    foto_pool = [seed_data.make_foto(rng, 150) for _ in range(min(fotos, 4))]
+    bericht = seed_data.make_bericht(
+        rng, 1, kunde, techniker, [foto_pool[n % len(foto_pool)] for n in range(fotos)], mit_pruefbericht=bool(pb)
+    )
+    bericht["arbeitszeiten"] = (bericht["arbeitszeiten"] * zeiten)[:zeiten]
+    bericht["materialien"] = [
+        {"menge": n + 1, "einheit": "Stk", "bezeichnung": f"Dichtung {n}"} for n in range(materialien)
+    ]
+    return bericht, kunde
+
+
+# Flowables drawn during the current render, filled by the afterFlowable hook
+_struktur: Optional[List[Dict[str, Any]]] = None
+
+
+def zelltext(zelle) -> str:
+    if isinstance(zelle, (list, tuple)):
+        return " ".join(zelltext(z) for z in zelle)
+    if isinstance(zelle, Paragraph):
+        return zelle.getPlainText()
+    if isinstance(zelle, (Image, pdf_generator.LazyFoto)):
+        return "[Bild]"
+    return str(zelle) if zelle is not None else ""
+
+
+def beschreiben(flowable) -> Optional[Dict[str, Any]]:
+    if isinstance(flowable, (Spacer, ActionFlowable)):
+        return None
+    if isinstance(flowable, Paragraph):
+        return {"text": flowable.getPlainText()}
+    if isinstance(flowable, Image):
+        return {"bild": [round(flowable.drawWidth), round(flowable.drawHeight)]}
+    if isinstance(flowable, Table):
+        return {"tabelle": [[zelltext(zelle) for zelle in zeile] for zeile in flowable._cellvalues]}
+    return {"flowable": type(flowable).__name__}
+
+
+def after_flowable(doc, flowable):
+    if _struktur is None:
+        return
+    eintrag = beschreiben(flowable)
+    if eintrag is not None:
+        _struktur.append({"seite": doc.page, "y": round(doc.frame._y), **eintrag})
+
+
+# The generator builds its own document template; hook every template instead
+BaseDocTemplate.afterFlowable = after_flowable
+
+
+def seiten_zaehlen(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type\s*/Page[^s]", pdf))
+
+
+def struktur_erfassen(generator: HotiEnergieTechPDFGenerator, bericht, kunde) -> Dict[str, Any]:
+    global _struktur
+    _struktur = []
+    try:
+        pdf = generator.generate_work_report_pdf(bericht, kunde)
+        return {"seiten": seiten_zaehlen(pdf), "flowables": _struktur}
+    finally:
+        _struktur = None
+
+
+def golden_vergleichen(name: str, struktur: Dict[str, Any], aktualisieren: bool) -> Optional[str]:
+    """None when the structure matches the golden file, otherwise a short description of the first difference"""
+    datei = GOLDEN_VERZEICHNIS / f"{name}.json"
+    if aktualisieren:
+        datei.parent.mkdir(parents=True, exist_ok=True)
+        datei.write_text(json.dumps(struktur, indent=1, ensure_ascii=False), encoding="utf-8")
+        return None
+    if not datei.exists():
+        return "no golden file (run with --golden-aktualisieren)"
+    golden = json.loads(datei.read_text(encoding="utf-8"))
+    if golden["seiten"] != struktur["seiten"]:
+        return f"{struktur['seiten']} pages instead of {golden['seiten']}"
+    for index, (erwartet, aktuell) in enumerate(zip(golden["flowables"], struktur["flowables"])):
+        if erwartet != aktuell:
+            return f"flowable {index} differs: expected {json.dumps(erwartet, ensure_ascii=False)[:120]}, " \
+                   f"got {json.dumps(aktuell, ensure_ascii=False)[:120]}"
+    if len(golden["flowables"]) != len(struktur["flowables"]):
+        return f"{len(struktur['flowables'])} flowables instead of {len(golden['flowables'])}"
+    return None
+
+
+def messen(generator: HotiEnergieTechPDFGenerator, bericht, kunde, runs: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf = generator.generate_work_report_pdf(bericht, kunde)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    # Separate run, tracemalloc slows rendering down considerably
+    tracemalloc.start()
+    generator.generate_work_report_pdf(bericht, kunde)
+    _, spitze = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "min_ms": round(timings[0], 2),
+        "p50_ms": round(statistics.median(timings), 2),
+        "spitze_mb": round(spitze / 1e6, 2),
+        "bytes": len(pdf),
+        "seiten": seiten_zaehlen(pdf),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--faelle", default=",".join(FAELLE), help="Comma separated cases")
+    parser.add_argument("--golden-aktualisieren", action="store_true", help="Write the current structure as golden")
+    parser.add_argument("--ausgabe", help="Write results as JSON")
+    parser.add_argument("--vergleich", help="Earlier result file to compare p50 with")
+    args = parser.parse_args()
+
+    faelle = args.faelle.split(",")
+    unbekannt = set(faelle) - set(FAELLE)
+    if unbekannt:
+        parser.error(f"unknown cases: {', '.join(sorted(unbekannt))}")
+
+    pdf_generator.datetime = FesteZeit
+    generator = HotiEnergieTechPDFGenerator()
+    basis = json.loads(Path(args.vergleich).read_text(encoding="utf-8"))["faelle"] if args.vergleich else {}
+
+    print(f"📄 PDF generation, {args.runs} runs per case")
+    ergebnisse = {}
+    abweichungen = 0
+    for name in faelle:
+        bericht, kunde = make_fall(name)
+        abweichung = golden_vergleichen(name, struktur_erfassen(generator, bericht, kunde), args.golden_aktualisieren)
+        ergebnis = ergebnisse[name] = messen(generator, bericht, kunde, args.runs)
+        zeile = (f"   {name:<11} p50 {ergebnis['p50_ms']:>9} ms   peak {ergebnis['spitze_mb']:>7} MB   "
+                 f"{ergebnis['bytes']:>9} bytes   {ergebnis['seiten']:>2} pages")
+        if name in basis:
+            zeile += f"   ({(ergebnis['p50_ms'] / basis[name]['p50_ms'] - 1) * 100:+.1f}% p50)"
+        print(zeile)
+        if abweichung:
+            abweichungen += 1
+            print(f"      ❌ structure: {abweichung}")
+
+    if args.golden_aktualisieren:
+        print(f"💾 Golden files written to {GOLDEN_VERZEICHNIS}")
+    if args.ausgabe:
+        ausgabe = Path(args.ausgabe)
+        ausgabe.parent.mkdir(parents=True, exist_ok=True)
+        ausgabe.write_text(json.dumps({
+            "zeitpunkt": datetime.now().isoformat(timespec="seconds"), "runs": args.runs, "faelle": ergebnisse
+        }, indent=2), encoding="utf-8")
+    if abweichungen:
+        print(f"❌ {abweichungen} case(s) differ from the golden page structure")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
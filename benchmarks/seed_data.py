@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Seed data for benchmarks: customers, technicians and reports with photos and Prüfberichte
+
+Generated data is deterministic for a given --seed, so runs against the same
+parameters are comparable. Photos are real JPEGs (noise, so they don't compress
+away) of roughly --foto-kb each.
+
+Usage: python benchmarks/seed_data.py --mongo-url mongodb://localhost:27017 --db-name hoti_bench
+           [--kunden 50] [--techniker 5] [--berichte 500] [--fotos 3] [--foto-kb 150] [--drop]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+from passlib.context import CryptContext
+from PIL import Image
+
+# Credentials of the seeded accounts
+ADMIN_BENUTZERNAME = "bench_admin"
+TECHNIKER_BENUTZERNAME = "bench_techniker{}"
+PASSWORT = "bench-passwort"
+
+
+def make_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_foto(rng: random.Random, kb: int) -> str:
+    """Base64 JPEG of about `kb` kilobytes"""
+    # Noise JPEGs at quality 75 take about 1.1 bytes per pixel
+    seite = max(16, int((kb * 1024 / 1.1) ** 0.5))
+    bild = Image.frombytes("RGB", (seite, seite), rng.randbytes(seite * seite * 3))
+    buffer = io.BytesIO()
+    bild.save(buffer, format="JPEG", quality=75)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def make_benutzer(rng: random.Random, passwort_hash: str, techniker: int) -> List[Dict[str, Any]]:
+    jetzt = datetime.utcnow()
+    benutzer = [{
+        "id": make_id(rng), "benutzername": ADMIN_BENUTZERNAME, "email": "admin@bench.local",
+        "passwort_hash": passwort_hash, "vollname": "Bench Admin", "rolle": "admin",
+        "aktiv": True, "token_version": 0, "erstellt_am": jetzt
+    }]
+    for n in range(techniker):
+        benutzer.append({
+            "id": make_id(rng), "benutzername": TECHNIKER_BENUTZERNAME.format(n),
+            "email": f"techniker{n}@bench.local", "passwort_hash": passwort_hash,
+            "vollname": f"Techniker {n}", "rolle": "techniker", "aktiv": True,
+            "token_version": 0, "erstellt_am": jetzt
+        })
+    return benutzer
+
+
+def make_kunde(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {
+        "id": make_id(rng), "firmenname": f"Bench Kunde {i} GmbH", "strasse": f"Hauptstraße {i}",
+        "plz": f"{1010 + i % 230}", "ort": "Wien", "ansprechpartner": f"Ansprechpartner {i}",
+        "email": f"kunde{i}@bench.local", "telefon": f"+43 1 {100000 + i}",
+        "erstellt_am": datetime(2025, 1, 1) + timedelta(hours=i)
+    }
+
+
+def make_pruefbericht(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {
+        "pruefnummer": f"P-{i}", "pruefdatum": "2025-03-01", "befund_nr": f"B-{i}", "zeichen": "", "dvr": "",
+        "feuerungsanlage": {"adresse_anlage": "Wien", "art": "Gas", "fabrikat_type": "Vaillant ecoTEC",
+                            "leistung_kw": str(rng.choice([18, 24, 35])), "aufstellungsort": "Keller",
+                            "brennstoff": "Erdgas"},
+        "messgeraet": {"fabrikat": "Testo", "typenbezeichnung": "330", "kalibrierstelle": "Testo Wien",
+                       "letztkalibrierung": "2024-12-01"},
+        "anlass": {"erstmalige_einfache": False, "wiederkehrende_pruefung": True,
+                   "maengelbehebung": False, "ausserordentliche_pruefung": False},
+        "messwerte": {"abgastemperatur": str(rng.randint(90, 160)), "verbrennungslufttemperatur": "20",
+                      "co2_o2_gehalt": "9.5", "co_gehalt": str(rng.randint(5, 40)), "kesseltemperatur": "65",
+                      "foerderdruck": "-5", "russzahl": "0", "abgasverlust_wert": str(rng.randint(3, 8)),
+                      "abgasverlust_grenzwert": "10", "nox_gehalt_wert": str(rng.randint(40, 110)),
+                      "nox_gehalt_grenzwert": "120", "co_gehalt_3o2_wert": "15", "co_gehalt_3o2_grenzwert": "100"},
+        "maengel": {"maengel_vorhanden": False, "behebung_bis": "", "art_maengel_bemerkung": ""},
+    }
+
+
+def make_bericht(
+    rng: random.Random,
+    i: int,
+    kunde: Dict[str, Any],
+    techniker: Dict[str, Any],
+    fotos: List[str],
+    mit_pruefbericht: bool
+) -> Dict[str, Any]:
+    erstellt = datetime(2025, 1, 1) + timedelta(hours=3 * i)
+    return {
+        "id": make_id(rng),
+        "nummer": f"AB-2025-{i + 1:04d}",
+        "kunde_id": kunde["id"],
+        "kunde_firmenname": kunde["firmenname"],
+        "projektleiter": "info@hotienergietec.at",
+        "komm_nr": f"K-{i}",
+        "durchgefuehrte_arbeiten": "Wartung der Gastherme, Abgasmessung und Dichtheitsprüfung. " * rng.randint(1, 8),
+        "arbeitszeiten": [
+            {"name": techniker["vollname"], "datum": erstellt.strftime("%Y-%m-%d"), "beginn": "08:00",
+             "ende": "12:00", "pause": 15, "arbeitszeit": "3:45", "wegzeit": "0:30", "normal": "3:45",
+             "ue50": "0", "ue100": "0"}
+            for _ in range(rng.randint(1, 5))
+        ],
+        "materialien": [
+            {"menge": n + 1, "einheit": "Stk", "bezeichnung": f"Dichtung {n}"} for n in range(rng.randint(0, 15))
+        ],
+        "fotos": [
+            {"id": make_id(rng), "filename": f"foto{n}.jpg", "data": daten, "beschreibung": "Kessel"}
+            for n, daten in enumerate(fotos)
+        ],
+        "arbeit_abgeschlossen": True,
+        "offene_arbeiten": None,
+        "verrechnung": "Regie",
+        "unterschrift_kunde": None,
+        "status": rng.choice(["entwurf", "abgeschlossen"]),
+        "techniker_id": techniker["id"],
+        "techniker_name": techniker["vollname"],
+        "erstellt_am": erstellt,
+        "aktualisiert_am": erstellt + timedelta(hours=4),
+        "pruefbericht_feuerung": make_pruefbericht(rng, i) if mit_pruefbericht else None,
+    }
+
+
+async def seed(
+    db,
+    kunden: int = 50,
+    techniker: int = 5,
+    berichte: int = 500,
+    fotos: int = 3,
+    foto_kb: int = 150,
+    seed_wert: int = 42,
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+) -> Dict[str, Any]:
+    """Insert the data set into `db` (Motor or mongomock-motor) and return ids for the load test"""
+    rng = random.Random(seed_wert)
+    passwort_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=bcrypt_rounds).hash(PASSWORT)
+    benutzer = make_benutzer(rng, passwort_hash, techniker)
+    kunden_docs = [make_kunde(rng, i) for i in range(kunden)]
+    # A small pool of photos is shared between reports; encoding a fresh JPEG per report is slow
+    foto_pool = [make_foto(rng, foto_kb) for _ in range(max(fotos, 1) * 4)]
+    techniker_docs = benutzer[1:] or benutzer
+
+    await db.benutzer.insert_many(benutzer)
+    await db.kunden.insert_many(kunden_docs)
+    bericht_ids = []
+    for start in range(0, berichte, 100):
+        batch = [
+            make_bericht(
+                rng, i, rng.choice(kunden_docs), rng.choice(techniker_docs),
+                rng.sample(foto_pool, fotos), mit_pruefbericht=rng.random() < 0.5
+            )
+            for i in range(start, min(start + 100, berichte))
+        ]
+        await db.arbeitsberichte.insert_many(batch)
+        bericht_ids.extend(b["id"] for b in batch)
+    return {
+        "benutzer": [b["benutzername"] for b in benutzer],
+        "kunde_ids": [k["id"] for k in kunden_docs],
+        "bericht_ids": bericht_ids,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="hoti_bench")
+    parser.add_argument("--kunden", type=int, default=50)
+    parser.add_argument("--techniker", type=int, default=5)
+    parser.add_argument("--berichte", type=int, default=500)
+    parser.add_argument("--fotos", type=int, default=3, help="Photos per report")
+    parser.add_argument("--foto-kb", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="Drop the database first")
+    args = parser.parse_args()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo_url)
+    if args.drop:
+        await client.drop_database(args.db_name)
+    ergebnis = await seed(
+        client[args.db_name], args.kunden, args.techniker, args.berichte, args.fotos, args.foto_kb, args.seed
+    )
+    print(f"🌱 Seeded {args.db_name}: {len(ergebnis['benutzer'])} users, {args.kunden} customers, "
+          f"{len(ergebnis['bericht_ids'])} reports with {args.fotos} photos each")
+    print(f"   Login: {ADMIN_BENUTZERNAME} / {PASSWORT}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -113,9 +113,19 @@ self.addEventListener('sync', (event) => {
 self.addEventListener('push', (event) => {
   console.log('Service Worker: Push notification received');
   
-  const title = 'HotiEnergieTec';
+  // The server sends JSON ({title, body, ...}); plain text is shown as the body
+  let payload = {};
+  if (event.data) {
+    try {
+      payload = event.data.json();
+    } catch (error) {
+      payload = { body: event.data.text() };
+    }
+  }
+
+  const title = payload.title || 'HotiEnergieTec';
   const options = {
-    body: event.data ? event.data.text() : 'Neue Benachrichtigung',
+    body: payload.body || 'Neue Benachrichtigung',
     icon: '/icon-192.png',
     badge: '/icon-192.png',
     vibrate: [200, 100, 200],
@@ -4,10 +4,53 @@ import axios from 'axios';
 import ReportDetailPage from './ReportDetail';
 import CalendarView from './CalendarView';
 import SettingsPage from './SettingsPage';
+import { useLiveEvents } from './LiveEvents';
 import './App.css';
 
 const API = 'https://hoti-backend.onrender.com/api';
 
+// Access tokens are short-lived; on 401 trade the refresh token for a new pair once and retry
+let refreshRequest = null;
+
+// These answer 401 for bad credentials or tokens; refreshing can't help them
+const AUTH_OHNE_REFRESH = ['/auth/anmelden', '/auth/token/erneuern', '/auth/abmelden'];
+
+const tokensErneuern = async () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) throw new Error('No refresh token');
+  const response = await axios.post(`${API}/auth/token/erneuern`, { refresh_token: refreshToken });
+  const { access_token, refresh_token } = response.data;
+  localStorage.setItem('token', access_token);
+  localStorage.setItem('refresh_token', refresh_token);
+  axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
+  return access_token;
+};
+
+// Share one refresh between concurrent callers; refresh tokens are single use
+export const refreshTokens = () => {
+  refreshRequest = refreshRequest || tokensErneuern().finally(() => { refreshRequest = null; });
+  return refreshRequest;
+};
+
+axios.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status !== 401 || !original || original._retried ||
+        AUTH_OHNE_REFRESH.some(pfad => original.url?.includes(pfad))) {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      const accessToken = await refreshTokens();
+      original.headers['Authorization'] = `Bearer ${accessToken}`;
+      return axios(original);
+    } catch (refreshError) {
+      return Promise.reject(error);
+    }
+  }
+);
+
 // Auth Context
 const AuthContext = React.createContext();
 
@@ -31,6 +74,7 @@ const AuthProvider = ({ children }) => {
       setUser(response.data);
     } catch (error) {
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       delete axios.defaults.headers.common['Authorization'];
     }
     setLoading(false);
@@ -43,8 +87,9 @@ const AuthProvider = ({ children }) => {
         passwort: passwort
       });
       
-      const { access_token, benutzer } = response.data;
+      const { access_token, refresh_token, benutzer } = response.data;
       localStorage.setItem('token', access_token);
+      localStorage.setItem('refresh_token', refresh_token);
       axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
       setUser(benutzer);
       return true;
@@ -54,7 +99,12 @@ const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      axios.post(`${API}/auth/abmelden`, { refresh_token: refreshToken }).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     delete axios.defaults.headers.common['Authorization'];
     setUser(null);
   };
@@ -241,6 +291,8 @@ const DashboardPage = () => {
     loadDashboardData();
   }, []);
 
+  useLiveEvents(API, ['arbeitsbericht'], () => loadDashboardData());
+
   const loadDashboardData = async () => {
     try {
       const [statsResponse, reportsResponse] = await Promise.all([
@@ -376,6 +428,8 @@ const ReportsPage = () => {
     loadReports();
   }, [filter]);
 
+  useLiveEvents(API, ['arbeitsbericht'], () => loadReports());
+
   const loadReports = async () => {
     setLoading(true);
     setError('');
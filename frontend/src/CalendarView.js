@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { useLiveEvents } from './LiveEvents';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -38,6 +39,8 @@ const CalendarView = () => {
     };
   }, [selectedDate]);
 
+  useLiveEvents(API, ['kalender'], () => loadTermine());
+
   const loadTermine = async () => {
     try {
       // Try to load from cache first when offline
@@ -0,0 +1,94 @@
+// Live updates via Server-Sent Events, so pages reload only when something changed
+import { useEffect, useRef } from 'react';
+import { refreshTokens } from './App';
+
+const EVENT_TYPES = ['erstellt', 'geaendert', 'geloescht', 'resync'];
+const RECONNECT_BASIS_MS = 1000;
+const RECONNECT_MAX_MS = 60000;
+
+// True when the access token is expired or about to, judged by its exp claim
+const tokenAbgelaufen = (token) => {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+    return payload.exp * 1000 < Date.now() + 5000;
+  } catch (error) {
+    return true;
+  }
+};
+
+export const useLiveEvents = (api, entitaeten, onChange) => {
+  const onChangeRef = useRef(onChange);
+  onChangeRef.current = onChange;
+  const entitaetenKey = entitaeten.join(',');
+
+  useEffect(() => {
+    if (!window.EventSource) return undefined;
+
+    let source = null;
+    let reconnectTimer = null;
+    let reloadTimer = null;
+    let connectedBefore = false;
+    let closed = false;
+    let versuche = 0;
+
+    // A burst of changes triggers a single reload
+    const scheduleReload = () => {
+      clearTimeout(reloadTimer);
+      reloadTimer = setTimeout(() => onChangeRef.current(), 300);
+    };
+
+    const handleEvent = (event) => {
+      const aenderung = JSON.parse(event.data);
+      if (aenderung.aktion === 'resync' || entitaetenKey.split(',').includes(aenderung.entitaet)) {
+        scheduleReload();
+      }
+    };
+
+    const reconnect = async () => {
+      source.close();
+      if (tokenAbgelaufen(localStorage.getItem('token') || '')) {
+        try {
+          await refreshTokens();
+        } catch (error) {
+          // A rejected or missing refresh token won't work on the next attempt either; network errors are retried
+          if (error.response || !localStorage.getItem('refresh_token')) {
+            console.error('Live updates: session expired, stopping', error);
+            return;
+          }
+          console.error('Live updates: token refresh failed, retrying', error);
+        }
+      }
+      // Exponential backoff with jitter, so tabs don't reconnect in lockstep after an outage
+      const verzoegerung = Math.min(RECONNECT_MAX_MS, RECONNECT_BASIS_MS * 2 ** versuche);
+      versuche += 1;
+      if (!closed) reconnectTimer = setTimeout(connect, verzoegerung / 2 + Math.random() * verzoegerung / 2);
+    };
+
+    const connect = () => {
+      const token = localStorage.getItem('token');
+      if (!token || closed) return;
+
+      source = new EventSource(`${api}/events?token=${encodeURIComponent(token)}`);
+      EVENT_TYPES.forEach(type => source.addEventListener(type, handleEvent));
+      source.addEventListener('token_abgelaufen', reconnect);
+      source.onopen = () => {
+        // Changes may have been missed while disconnected
+        if (connectedBefore) scheduleReload();
+        connectedBefore = true;
+        versuche = 0;
+      };
+      source.onerror = () => {
+        // CLOSED means the server rejected the stream (e.g. 401); otherwise the browser retries itself
+        if (source.readyState === EventSource.CLOSED) reconnect();
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      clearTimeout(reloadTimer);
+      if (source) source.close();
+    };
+  }, [api, entitaetenKey]);
+};
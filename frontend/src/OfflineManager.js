@@ -1,4 +1,5 @@
 // Offline Manager für HotiEnergieTech App
+import axios from 'axios';
 
 class OfflineManager {
   constructor() {
@@ -99,20 +100,15 @@ class OfflineManager {
     const token = localStorage.getItem('token');
     if (!token) throw new Error('No auth token');
     
-    const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api${endpoint}`, {
+    // Through axios, so the interceptor in App.js refreshes a token that expired while offline
+    const response = await axios({
       method,
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': `Bearer ${token}`
-      },
-      body: method !== 'GET' ? JSON.stringify(data) : undefined
+      url: `${process.env.REACT_APP_BACKEND_URL}/api${endpoint}`,
+      headers: { 'Authorization': `Bearer ${token}` },
+      data: method !== 'GET' ? data : undefined
     });
     
-    if (!response.ok) {
-      throw new Error(`HTTP ${response.status}`);
-    }
-    
-    return response.json();
+    return response.data;
   }
 
   // Cache data for offline use
@@ -1,11 +1,24 @@
 // Push Notification Manager für HotiEnergieTech App
 import React, { useState, useRef } from 'react';
+import axios from 'axios';
 
 class PushNotificationManager {
   constructor() {
     this.isSupported = 'serviceWorker' in navigator && 'PushManager' in window;
     this.subscription = null;
-    this.publicKey = 'BDqzGl8o6GjT7sGT8G8ASDASDASDASDASDASDASDASDASDASDASD'; // Replace with your VAPID public key
+    this.publicKey = null; // VAPID public key, loaded from the server
+  }
+
+  // Load the server's VAPID public key
+  async getPublicKey() {
+    if (!this.publicKey) {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/push/vapid-public-key`);
+      if (!response.ok) {
+        throw new Error('Push notifications not configured on server');
+      }
+      this.publicKey = (await response.json()).public_key;
+    }
+    return this.publicKey;
   }
 
   // Check if push notifications are supported
@@ -32,7 +45,7 @@ class PushNotificationManager {
     try {
       const subscription = await registration.pushManager.subscribe({
         userVisibleOnly: true,
-        applicationServerKey: this.urlBase64ToUint8Array(this.publicKey)
+        applicationServerKey: this.urlBase64ToUint8Array(await this.getPublicKey())
       });
 
       this.subscription = subscription;
@@ -53,16 +66,12 @@ class PushNotificationManager {
     const token = localStorage.getItem('token');
     if (!token) throw new Error('No auth token');
 
-    const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/push/subscribe`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': `Bearer ${token}`
-      },
-      body: JSON.stringify(subscription.toJSON())
-    });
-
-    if (!response.ok) {
+    // Through axios, so the interceptor in App.js refreshes an expired access token
+    try {
+      await axios.post(`${process.env.REACT_APP_BACKEND_URL}/api/push/subscribe`, subscription.toJSON(), {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+    } catch (error) {
       throw new Error('Failed to save push subscription');
     }
   }
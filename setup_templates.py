@@ -76,6 +76,9 @@ async def create_report_templates():
             print(f"✅ Template created: {template['name']}")
         else:
             print(f"ℹ️ Template already exists: {template['name']}")
+    
+    # Running servers reload their template cache when this version changes
+    await db.versionen.update_one({"_id": "vorlagen"}, {"$inc": {"version": 1}}, upsert=True)
 
 async def main():
     await create_report_templates()
@@ -0,0 +1,81 @@
+import asyncio
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import events
+from events import LiveBroadcaster, change_stream_verfolgen
+
+
+class FehlerStream:
+    """db.watch stand-in that raises the queued errors, one per attempt"""
+
+    def __init__(self, fehler):
+        self.fehler = list(fehler)
+        self.pipelines = []
+
+    def watch(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        fehler = self.fehler.pop(0) if self.fehler else asyncio.CancelledError()
+
+        class Stream:
+            async def __aenter__(self):
+                raise fehler
+
+            async def __aexit__(self, *args):
+                return False
+
+        return Stream()
+
+
+class ZaehlenderBroadcaster(LiveBroadcaster):
+    def __init__(self):
+        super().__init__()
+        self.resyncs = 0
+
+    def resync_alle(self):
+        self.resyncs += 1
+
+
+def verfolgen(fehler, monkeypatch):
+    pausen = []
+
+    async def sleep(sekunden):
+        pausen.append(sekunden)
+
+    monkeypatch.setattr(events.asyncio, "sleep", sleep)
+    db, broadcaster = FehlerStream(fehler), ZaehlenderBroadcaster()
+
+    async def lauf():
+        try:
+            await change_stream_verfolgen(db, broadcaster, retry_sekunden=5, max_retry_sekunden=30)
+            return "beendet"
+        except asyncio.CancelledError:
+            return "abgebrochen"
+
+    return asyncio.run(lauf()), pausen, broadcaster.resyncs, db
+
+
+def test_permanent_error_stops_without_resync(monkeypatch):
+    # e.g. MongoDB < 6.0 rejecting full_document_before_change
+    ergebnis, pausen, resyncs, _ = verfolgen([OperationFailure("unknown option", code=9)], monkeypatch)
+    assert (ergebnis, pausen, resyncs) == ("beendet", [], 0)
+
+
+def test_interruptions_back_off_exponentially(monkeypatch):
+    resumable = OperationFailure("interrupted", code=91, details={"errorLabels": ["ResumableChangeStreamError"]})
+    ergebnis, pausen, resyncs, _ = verfolgen([AutoReconnect("weg")] * 4 + [resumable], monkeypatch)
+    assert ergebnis == "abgebrochen"
+    assert pausen == [5, 10, 20, 30, 30]
+    assert resyncs == 0
+
+
+def test_history_lost_resyncs_clients(monkeypatch):
+    ergebnis, pausen, resyncs, _ = verfolgen([OperationFailure("history lost", code=286)], monkeypatch)
+    assert (ergebnis, pausen, resyncs) == ("abgebrochen", [5], 1)
+
+
+def test_pipeline_projects_router_fields(monkeypatch):
+    *_, db = verfolgen([OperationFailure("unknown option", code=9)], monkeypatch)
+    projektion = db.pipelines[0][-1]["$project"]
+    assert "fullDocument" not in projektion and "fullDocument.fotos" not in projektion
+    assert projektion["fullDocument.techniker_id"] == projektion["fullDocumentBeforeChange.id"] == 1
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from kalender import (
+    SERIE_OFFEN, freie_zeitfenster, naive_utc, ortszeit, overlap_filter, serie_ende, serie_expandieren, termine_expandieren,
+    ueberschneidungen, vorkommen, vorkommen_id
+)
+
+
+def serie(regel, start=datetime(2025, 1, 6, 8), dauer=timedelta(hours=2), **felder):
+    termin = {
+        "id": "s1", "techniker_id": "t1", "titel": "Wartung", "startzeit": start, "endzeit": start + dauer,
+        "wiederholung": regel, "ausnahmen": [], "serie_id": None, "original_startzeit": None,
+    }
+    termin["serie_ende"] = serie_ende(termin["startzeit"], termin["endzeit"], regel)
+    termin.update(felder)
+    return termin
+
+
+def einzel(id, start, dauer=timedelta(hours=1), **felder):
+    return {"id": id, "techniker_id": "t1", "startzeit": start, "endzeit": start + dauer, "wiederholung": None, **felder}
+
+
+# Expansion
+
+def test_weekly_byday_occurrences_in_window():
+    # 2025-01-06 is a Monday
+    beginne = list(vorkommen(
+        datetime(2025, 1, 6, 8), datetime(2025, 1, 6, 10), "FREQ=WEEKLY;BYDAY=MO,WE",
+        datetime(2025, 1, 6), datetime(2025, 1, 16)
+    ))
+    assert beginne == [datetime(2025, 1, 6, 8), datetime(2025, 1, 8, 8), datetime(2025, 1, 13, 8), datetime(2025, 1, 15, 8)]
+
+
+def test_window_far_from_start_jumps_directly():
+    beginne = list(vorkommen(
+        datetime(2025, 1, 1, 8), datetime(2025, 1, 1, 9), "FREQ=DAILY",
+        datetime(2125, 1, 1), datetime(2125, 1, 3)
+    ))
+    assert beginne == [datetime(2125, 1, 1, 8), datetime(2125, 1, 2, 8)]
+
+
+def test_occurrence_starting_before_window_is_included_when_it_overlaps():
+    beginne = list(vorkommen(
+        datetime(2025, 1, 1, 8), datetime(2025, 1, 1, 10), "FREQ=DAILY",
+        datetime(2025, 1, 3, 9), datetime(2025, 1, 3, 12)
+    ))
+    assert beginne == [datetime(2025, 1, 3, 8)]
+
+
+def test_count_limits_byday_series():
+    termin = serie("FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=4")
+    beginne = [t["startzeit"] for t in serie_expandieren(termin, datetime(2025, 1, 1), datetime(2025, 3, 1))]
+    assert beginne == [datetime(2025, 1, 6, 8), datetime(2025, 1, 8, 8), datetime(2025, 1, 10, 8), datetime(2025, 1, 13, 8)]
+    assert termin["serie_ende"] == datetime(2025, 1, 13, 10)
+
+
+def test_until_date_includes_the_whole_day():
+    termin = serie("FREQ=DAILY;UNTIL=20250108")
+    beginne = [t["startzeit"] for t in serie_expandieren(termin, datetime(2025, 1, 1), datetime(2025, 2, 1))]
+    assert beginne == [datetime(2025, 1, 6, 8), datetime(2025, 1, 7, 8), datetime(2025, 1, 8, 8)]
+
+
+def test_monthly_clamps_to_end_of_month():
+    beginne = list(vorkommen(
+        datetime(2025, 1, 31, 8), datetime(2025, 1, 31, 9), "FREQ=MONTHLY",
+        datetime(2025, 1, 1), datetime(2025, 4, 1)
+    ))
+    assert beginne == [datetime(2025, 1, 31, 8), datetime(2025, 2, 28, 8), datetime(2025, 3, 31, 8)]
+
+
+def test_open_series_has_no_end():
+    assert serie("FREQ=YEARLY")["serie_ende"] == SERIE_OFFEN
+
+
+@pytest.mark.parametrize("regel", ["FREQ=HOURLY", "FREQ=DAILY;COUNT=2;UNTIL=20250101", "FREQ=DAILY;BYDAY=MO", "FREQ=DAILY;BYSETPOS=1"])
+def test_unsupported_rules_are_rejected(regel):
+    with pytest.raises(ValueError):
+        serie_ende(datetime(2025, 1, 1), datetime(2025, 1, 1, 1), regel)
+
+
+# Exceptions (EXDATE) and overrides
+
+def test_exceptions_are_skipped():
+    termin = serie("FREQ=DAILY", ausnahmen=[datetime(2025, 1, 7, 8)])
+    beginne = [t["startzeit"] for t in serie_expandieren(termin, datetime(2025, 1, 6), datetime(2025, 1, 9))]
+    assert beginne == [datetime(2025, 1, 6, 8), datetime(2025, 1, 8, 8)]
+
+
+def test_occurrences_carry_series_identity():
+    [termin] = serie_expandieren(serie("FREQ=DAILY"), datetime(2025, 1, 7), datetime(2025, 1, 8))
+    assert termin["id"] == vorkommen_id("s1", datetime(2025, 1, 7, 8)) == "s1_20250107T080000"
+    assert termin["serie_id"] == "s1"
+    assert termin["original_startzeit"] == datetime(2025, 1, 7, 8)
+    assert termin["ausnahmen"] == []
+
+
+def test_override_replaces_its_occurrence():
+    # A moved occurrence is stored as a single appointment and as an exception of its series
+    basis = serie("FREQ=DAILY", ausnahmen=[datetime(2025, 1, 7, 8)])
+    verschoben = einzel("o1", datetime(2025, 1, 7, 13), serie_id="s1", original_startzeit=datetime(2025, 1, 7, 8))
+    termine = termine_expandieren([basis, verschoben], datetime(2025, 1, 7), datetime(2025, 1, 8))
+    assert [(t["id"], t["startzeit"]) for t in termine] == [("o1", datetime(2025, 1, 7, 13))]
+
+
+# Conflict sweep
+
+def test_sweep_finds_overlaps_and_ignores_touching_appointments():
+    neue = serie_expandieren(serie("FREQ=DAILY;COUNT=3"), datetime(2025, 1, 6), datetime(2025, 1, 9))
+    bestehende = [
+        einzel("davor", datetime(2025, 1, 6, 7)),       # ends when the first occurrence starts
+        einzel("mitte", datetime(2025, 1, 7, 9, 30)),  # inside the second occurrence
+        einzel("danach", datetime(2025, 1, 8, 10)),     # starts when the third one ends
+        einzel("spaeter", datetime(2025, 1, 20, 8)),
+    ]
+    assert [t["id"] for t in ueberschneidungen(neue, bestehende)] == ["mitte"]
+
+
+def test_sweep_reports_long_appointment_once():
+    neue = serie_expandieren(serie("FREQ=DAILY;COUNT=5"), datetime(2025, 1, 6), datetime(2025, 1, 11))
+    bestehende = [einzel("urlaub", datetime(2025, 1, 5), dauer=timedelta(days=10))]
+    assert [t["id"] for t in ueberschneidungen(neue, bestehende)] == ["urlaub"]
+
+
+def test_overlap_filter_bounds_series_by_their_end():
+    filter_query = overlap_filter(datetime(2025, 1, 1), datetime(2025, 2, 1))
+    einzel_filter, serie_filter = filter_query["$or"]
+    assert einzel_filter["endzeit"] == {"$gt": datetime(2025, 1, 1)}
+    assert serie_filter["serie_ende"] == {"$gt": datetime(2025, 1, 1)}
+    assert serie_filter["startzeit"] == einzel_filter["startzeit"] == {"$lt": datetime(2025, 2, 1)}
+
+
+# Availability
+
+def test_free_slots_per_technician():
+    start, ende = datetime(2025, 1, 7, 8), datetime(2025, 1, 7, 17)
+    termine = [
+        einzel("a", datetime(2025, 1, 7, 7), dauer=timedelta(hours=2)),  # starts before the window
+        einzel("b", datetime(2025, 1, 7, 10)),
+        einzel("c", datetime(2025, 1, 7, 10, 30)),                         # overlaps b
+        einzel("d", datetime(2025, 1, 7, 12), techniker_id="t2"),
+    ]
+    frei = freie_zeitfenster(termine, ["t1", "t2", "t3"], start, ende)
+    assert frei["t1"] == [(datetime(2025, 1, 7, 9), datetime(2025, 1, 7, 10)), (datetime(2025, 1, 7, 11, 30), ende)]
+    assert frei["t2"] == [(start, datetime(2025, 1, 7, 12)), (datetime(2025, 1, 7, 13), ende)]
+    assert frei["t3"] == [(start, ende)]
+
+
+def test_free_slots_respect_minimum_duration():
+    termine = [einzel("a", datetime(2025, 1, 7, 8, 30)), einzel("b", datetime(2025, 1, 7, 10))]
+    frei = freie_zeitfenster(termine, ["t1"], datetime(2025, 1, 7, 8), datetime(2025, 1, 7, 12), timedelta(hours=1))
+    assert frei["t1"] == [(datetime(2025, 1, 7, 11), datetime(2025, 1, 7, 12))]
+
+
+def test_free_slots_with_offset_bounds_against_stored_series():
+    start = naive_utc(datetime.fromisoformat("2025-01-07T09:00:00+01:00"))
+    ende = naive_utc(datetime.fromisoformat("2025-01-07T18:00:00+01:00"))
+    termine = termine_expandieren([serie("FREQ=DAILY")], start, ende)
+    assert freie_zeitfenster(termine, ["t1"], start, ende)["t1"] == [(datetime(2025, 1, 7, 10), datetime(2025, 1, 7, 17))]
+
+
+# Naive stored times against aware client times
+
+def test_naive_utc_converts_offsets():
+    assert naive_utc(datetime(2025, 1, 7, 9, tzinfo=timezone(timedelta(hours=1)))) == datetime(2025, 1, 7, 8)
+    assert naive_utc(datetime.fromisoformat("2025-01-07T08:00:00.000Z")) == datetime(2025, 1, 7, 8)
+    assert naive_utc(datetime(2025, 1, 7, 8)) == datetime(2025, 1, 7, 8)
+    assert naive_utc(None) is None
+
+
+def test_client_appointment_with_offset_against_stored_series():
+    from server import KalenderTermin
+
+    # As sent by CalendarView: toISOString() values ending in "Z"
+    neu = KalenderTermin(
+        titel="Notdienst", techniker_id="t1",
+        startzeit="2025-01-07T09:00:00.000Z", endzeit="2025-01-07T10:00:00.000Z"
+    ).model_dump()
+    assert neu["startzeit"] == datetime(2025, 1, 7, 9) and neu["startzeit"].tzinfo is None
+
+    gespeichert = termine_expandieren([serie("FREQ=DAILY")], neu["startzeit"], neu["endzeit"])
+    assert [t["id"] for t in ueberschneidungen([neu], gespeichert)] == ["s1_20250107T080000"]
+
+
+def test_series_with_offset_and_exceptions_is_stored_naive():
+    from server import KalenderTermin
+
+    termin = KalenderTermin(
+        titel="Wartung", techniker_id="t1", wiederholung="FREQ=DAILY",
+        startzeit="2025-01-06T09:00:00+01:00", endzeit="2025-01-06T11:00:00+01:00",
+        ausnahmen=["2025-01-07T08:00:00Z"], original_startzeit="2025-01-06T08:00:00Z"
+    )
+    assert termin.startzeit == datetime(2025, 1, 6, 8)
+    assert termin.ausnahmen == [datetime(2025, 1, 7, 8)]
+    assert termin.original_startzeit == datetime(2025, 1, 6, 8)
+    beginne = [t["startzeit"] for t in serie_expandieren(
+        {**termin.model_dump(), "serie_ende": SERIE_OFFEN}, datetime(2025, 1, 6), datetime(2025, 1, 9)
+    )]
+    assert beginne == [datetime(2025, 1, 6, 8), datetime(2025, 1, 8, 8)]
+
+
+def test_ortszeit_for_display():
+    # CET in winter, CEST in summer
+    assert f"{ortszeit(datetime(2025, 1, 7, 8)):%d.%m.%Y %H:%M}" == "07.01.2025 09:00"
+    assert f"{ortszeit(datetime(2025, 7, 7, 8)):%d.%m.%Y %H:%M}" == "07.07.2025 10:00"
+    assert f"{ortszeit(datetime(2025, 12, 31, 23, 30)):%d.%m.%Y %H:%M}" == "01.01.2026 00:30"
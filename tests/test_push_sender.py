@@ -0,0 +1,94 @@
+import asyncio
+import base64
+
+from aiohttp import web
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from push_sender import WebPushSender
+
+
+def b64url(daten: bytes) -> str:
+    return base64.urlsafe_b64encode(daten).rstrip(b"=").decode("ascii")
+
+
+def vapid_schluessel() -> str:
+    """Private VAPID key in the raw base64url form the server reads from VAPID_PRIVATE_KEY"""
+    schluessel = ec.generate_private_key(ec.SECP256R1())
+    return b64url(schluessel.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def abonnement(id: str, endpoint: str) -> dict:
+    # A real client key pair, so the payload can be encrypted for it
+    p256dh = ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {"id": id, "benutzer_id": "b1", "endpoint": endpoint, "keys": {"p256dh": b64url(p256dh), "auth": b64url(b"0123456789abcdef")}}
+
+
+class Abonnements:
+    """The two collection calls senden makes, on a list"""
+
+    def __init__(self, dokumente):
+        self.dokumente = dokumente
+        self.geloescht = []
+
+    async def _cursor(self):
+        for dokument in list(self.dokumente):
+            yield dokument
+
+    def find(self, filter_query, projection=None):
+        return self._cursor()
+
+    async def delete_many(self, filter_query):
+        ids = set(filter_query["id"]["$in"])
+        self.geloescht.extend(sorted(ids))
+        vorher = len(self.dokumente)
+        self.dokumente = [d for d in self.dokumente if d["id"] not in ids]
+
+        class Ergebnis:
+            deleted_count = vorher - len(self.dokumente)
+        return Ergebnis()
+
+
+class Db:
+    def __init__(self, abonnements):
+        self.push_abonnements = abonnements
+
+
+def test_senden_counts_and_removes_expired_subscriptions():
+    anfragen = []
+
+    async def push_dienst(request: web.Request):
+        # Stand-in push service: one subscription is alive, the other one is gone
+        anfragen.append((request.match_info["name"], request.headers.get("Content-Encoding"), request.headers.get("Authorization", "")))
+        await request.read()
+        return web.Response(status=201 if request.match_info["name"] == "aktiv" else 410)
+
+    async def lauf():
+        app = web.Application()
+        app.router.add_post("/push/{name}", push_dienst)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+
+        db = Db(Abonnements([
+            abonnement("a1", f"http://127.0.0.1:{port}/push/aktiv"),
+            abonnement("a2", f"http://127.0.0.1:{port}/push/abgelaufen"),
+        ]))
+        sender = WebPushSender(vapid_schluessel(), "mailto:test@hotienergietec.at", concurrency=2)
+        try:
+            ergebnis = await sender.senden(db, {"title": "Test", "body": "Hallo"})
+        finally:
+            await sender.close()
+            await runner.cleanup()
+        return ergebnis, db.push_abonnements
+
+    ergebnis, abonnements = asyncio.run(lauf())
+    assert ergebnis == {"gesendet": 1, "fehlgeschlagen": 0, "entfernt": 1}
+    assert abonnements.geloescht == ["a2"]
+    assert [d["id"] for d in abonnements.dokumente] == ["a1"]
+    assert sorted(name for name, *_ in anfragen) == ["abgelaufen", "aktiv"]
+    assert all(encoding == "aes128gcm" and authorization.startswith("vapid t=") for _, encoding, authorization in anfragen)